@@ -1,6 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
-from django.db.models import Q
+
+from .forms import EMAIL_CHECK
 
 
 class AuthPhoneOrEmailBackend(ModelBackend):
@@ -10,12 +11,18 @@ class AuthPhoneOrEmailBackend(ModelBackend):
     or an email address while ingoring guests.
     """
     def authenticate(self, request, username=None, password=None):
+        if username is None or password is None:
+            return None
+
+        # look up a single indexed column, as CustomAuthForm does
+        if EMAIL_CHECK in username:
+            lookup = {'email': username}
+        else:
+            lookup = {'phone_number': username}
+
         user_model = get_user_model()
         try:
-            user = user_model.objects.get(
-                (Q(phone_number=username) | Q(email=username))
-                & Q(is_guest=False)
-            )
+            user = user_model.objects.get(is_guest=False, **lookup)
         except user_model.DoesNotExist:
             return None
 
@@ -14,6 +14,22 @@ YEARS_RANGE = 100
 YEARS = range(CURRENT_YEAR, CURRENT_YEAR - YEARS_RANGE, -1)
 
 
+def add_duplicate_errors(form):
+    """
+    Add errors on phone number and email of a user form
+    if they are already taken by other registered users.
+    """
+    cd = form.cleaned_data
+    # an updated user's own phone number and email are not duplicates
+    duplicates = User.objects.find_registered_duplicates(
+        cd.get('phone_number'), cd.get('email'), form.instance.pk)
+    if 'email' in duplicates:
+        form.add_error('email', "This email is already registered")
+    if 'phone_number' in duplicates:
+        form.add_error(
+            'phone_number', "This phone number is already registered")
+
+
 class CustomUserForm(forms.ModelForm):
     """A base form specifying User model, fields and clean methods.
     """
@@ -49,16 +65,8 @@ class CustomUserForm(forms.ModelForm):
         """
         Phone number and email are unique for registered users.
         """
-        cd = self.cleaned_data
-        registered_users = User.objects.filter(is_guest=False)
-        if (cd.get('email') is not None and
-                registered_users.filter(email=cd['email']).exists()):
-            self.add_error('email', "This email is already registered")
-        if (cd.get('phone_number') is not None and registered_users.filter(
-                phone_number=cd['phone_number']).exists()):
-            self.add_error(
-                'phone_number', "This phone number is already registered")
-        return cd
+        add_duplicate_errors(self)
+        return self.cleaned_data
 
 
 class UserCreationForm(CustomUserForm):
@@ -116,26 +124,19 @@ class UserChangeForm(forms.ModelForm):
         # field does not have access to the initial value
         return self.initial["password"]
 
-
-class UserUpdateForm(CustomUserForm):
-    """A form presented to users for updating their personal information.
-    """
-
     def clean(self):
         """
-        Don't pass not updated email and phone number to super().clean.
+        Phone number and email are unique for registered users.
         """
-        cd = self.cleaned_data
-        user = self.instance
-        not_changed = {}
-        unique_fields = ['email', 'phone_number']
+        cleaned_data = super().clean()
+        if not self.instance.is_guest:
+            add_duplicate_errors(self)
+        return cleaned_data
+
 
-        for field in unique_fields:
-            if getattr(user, field) == cd.get(field):
-                not_changed[field] = cd.pop(field)
-        super().clean()
-        cd.update(not_changed)
-        return cd
+class UserUpdateForm(CustomUserForm):
+    """A form presented to users for updating their personal information.
+    """
 
 
 class CustomAuthForm(AuthenticationForm):
@@ -174,6 +175,9 @@ class CustomOrderForm(CustomUserForm):
 
     def clean(self):
         """
-        Overwrite custom clean method.
+        Guests may order with registered phone numbers and emails,
+        logged in users change their own info, which is checked.
         """
+        if self.instance.pk is not None:
+            add_duplicate_errors(self)
         return self.cleaned_data
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.hashers import get_hasher
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from itertools import count
+
+from core.benchmark import benchmark_database, measure_rate
+
+
+class Command(BaseCommand):
+    help = "Measure sign-ups per second of the registration view."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--signups', type=int, default=50,
+            help="Number of sign-ups measured per hasher.")
+        parser.add_argument(
+            '--hasher', action='append', dest='hashers',
+            help=("Dotted path of a password hasher to measure, "
+                  "may be repeated. Defaults to PASSWORD_HASHERS."))
+
+    def handle(self, *args, **options):
+        phone_numbers = count(1000000)
+        with benchmark_database():
+            for hasher in options['hashers'] or [None]:
+                if hasher is None:
+                    rate = self.signups_per_second(
+                        phone_numbers, options['signups'])
+                    hasher = get_hasher().__class__.__name__
+                else:
+                    with override_settings(PASSWORD_HASHERS=[hasher]):
+                        rate = self.signups_per_second(
+                            phone_numbers, options['signups'])
+                self.stdout.write(f'{hasher:<50} {rate:8.1f} sign-ups/s')
+
+    def signups_per_second(self, phone_numbers, signups):
+        url = reverse('accounts:register')
+
+        def sign_up():
+            phone_number = str(next(phone_numbers))
+            response = Client().post(url, {
+                'phone_number': phone_number,
+                'first_name': 'Bench',
+                'second_name': 'Mark',
+                'email': f'{phone_number}@example.com',
+                'street': 'Street',
+                'house': '1',
+                'password1': 'benchpassword',
+                'password2': 'benchpassword',
+            })
+            if response.status_code != 302:
+                raise CommandError(
+                    f"Sign-up failed with status {response.status_code}.")
+
+        return measure_rate(sign_up, signups)
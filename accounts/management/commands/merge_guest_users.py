@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max
+
+from orders.models import OrderInfo
+
+USER_MODEL = get_user_model()
+
+# guests are only duplicates when orders are delivered to the same details
+GUEST_DETAILS = (
+    'phone_number', 'first_name', 'second_name',
+    'street', 'house', 'apartment', 'email')
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge guest users sharing a phone number, name, address and "
+        "email into the latest one, moving their orders to it.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Number of phone numbers merged per transaction.")
+
+    def handle(self, *args, **options):
+        duplicates = list(
+            USER_MODEL.objects.filter(is_guest=True)
+            .values(*GUEST_DETAILS)
+            .annotate(guests=Count('id'), keep_id=Max('id'))
+            .filter(guests__gt=1))
+
+        batch_size = options['batch_size']
+        merged = 0
+        for start in range(0, len(duplicates), batch_size):
+            merged += self.merge_batch(duplicates[start:start + batch_size])
+        self.stdout.write(f"Merged {merged} duplicate guest users.")
+
+    @transaction.atomic
+    def merge_batch(self, batch):
+        """
+        Re-point orders of duplicate guests to the kept one
+        and delete duplicates of the whole batch at once.
+        """
+        leftover_ids = []
+        for duplicate in batch:
+            details = {field: duplicate[field] for field in GUEST_DETAILS}
+            duplicate_ids = list(
+                USER_MODEL.objects
+                .filter(is_guest=True, **details)
+                .exclude(pk=duplicate['keep_id'])
+                .values_list('pk', flat=True))
+            OrderInfo.objects.filter(
+                user_id__in=duplicate_ids).update(
+                user_id=duplicate['keep_id'])
+            leftover_ids.extend(duplicate_ids)
+        USER_MODEL.objects.filter(pk__in=leftover_ids).delete()
+        return len(leftover_ids)
@@ -1,6 +1,9 @@
 from django.db import models
+from django.db.models import Q, Count
 from django.contrib.auth.models import BaseUserManager, AbstractBaseUser
 import re
+import operator
+from functools import reduce
 
 
 class CustomUserManager(BaseUserManager):
@@ -17,21 +20,21 @@ class CustomUserManager(BaseUserManager):
             # if not checked this way
             raise ValueError('Users must have a phone number')
 
+        phone_number = re.sub(r'\D', '', phone_number)
         if is_guest is False:
             """
             Phone number and email are unique for registered users.
             """
-            registered_users = self.model.objects.filter(is_guest=False)
             if password is None:
                 raise ValueError('Registering users must have a password')
-            if (email is not None and
-                    registered_users.filter(email=email).exists()):
+            duplicates = self.find_registered_duplicates(phone_number, email)
+            if 'email' in duplicates:
                 raise ValueError('This email is already registered')
-            if registered_users.filter(phone_number=phone_number).exists():
+            if 'phone_number' in duplicates:
                 raise ValueError('This phone number is already registered')
 
         user = self.model(
-            phone_number=re.sub('\D', '', phone_number),
+            phone_number=phone_number,
             first_name=first_name,
             second_name=second_name,
             street=street,
@@ -79,6 +82,48 @@ class CustomUserManager(BaseUserManager):
             house, apartment, password, email, date_of_birth, True
         )
 
+    def find_registered_duplicates(
+            self, phone_number=None, email=None, exclude_pk=None):
+        """
+        Return a set of field names among phone number and email
+        already taken by registered users other than exclude_pk,
+        answering both questions with a single query.
+        """
+        lookups = {}
+        if phone_number:
+            lookups['phone_number'] = Q(phone_number=phone_number)
+        if email:
+            lookups['email'] = Q(email=email)
+        if not lookups:
+            return set()
+
+        registered_users = self.filter(
+            reduce(operator.or_, lookups.values()), is_guest=False)
+        if exclude_pk is not None:
+            registered_users = registered_users.exclude(pk=exclude_pk)
+        counts = registered_users.aggregate(**{
+            field: Count('pk', filter=lookup)
+            for field, lookup in lookups.items()})
+        return {field for field, count in counts.items() if count}
+
+    def get_or_create_guest_user(self, phone_number, **fields):
+        """
+        Reuse a guest user with the same phone number, name, address
+        and email, so guests don't pile up with every order, or create
+        a new one. Guests are never updated, as their orders are
+        delivered to the address of their user.
+        """
+        phone_number = re.sub(r'\D', '', phone_number)
+        fields['email'] = self.normalize_email(fields.get('email'))
+        fields.setdefault('apartment', '')
+        guest_user = self.filter(
+            is_guest=True, phone_number=phone_number, **fields
+        ).order_by('-id').first()
+        if guest_user is None:
+            guest_user = self.create_guest_user(
+                phone_number=phone_number, **fields)
+        return guest_user
+
     def create_guest_user(
             self, phone_number,
             first_name, second_name,
@@ -137,6 +182,30 @@ class User(AbstractBaseUser):
 
     objects = CustomUserManager()
 
+    class Meta:
+        # back up validation in CustomUserManager.find_registered_duplicates
+        # against concurrent registrations
+        constraints = [
+            # also serves logging in with phone number
+            models.UniqueConstraint(
+                fields=['phone_number'], name='unique_registered_phone',
+                condition=Q(is_guest=False)),
+            models.UniqueConstraint(
+                fields=['email'], name='unique_registered_email',
+                condition=Q(is_guest=False) & ~Q(email='')),
+        ]
+        indexes = [
+            # unique email index skips empty emails, so it can't serve
+            # logging in, which looks up registered users only
+            models.Index(
+                fields=['email'], name='registered_email_idx',
+                condition=Q(is_guest=False)),
+            # guests are reused by phone number on checkout
+            models.Index(
+                fields=['phone_number'], name='guest_phone_idx',
+                condition=Q(is_guest=True)),
+        ]
+
     USERNAME_FIELD = 'phone_number'
     REQUIRED_FIELDS = [
         'first_name',
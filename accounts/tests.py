@@ -2,11 +2,19 @@ from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.contrib import auth
-from django.db import utils
+from django.db import utils, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
 
 from datetime import date
+from io import StringIO
+from unittest import mock
 
+from .forms import UserChangeForm
 from .helpers import AccountsTestConstants
+from menu.models import MenuItem
+from orders.models import OrderInfo
+from orders.views import write_order_to_db
 
 USER_MODEL = get_user_model()
 
@@ -79,6 +87,52 @@ class UserModelTests(TestCase, AccountsTestConstants):
         except (utils.IntegrityError, ValueError):
             raise AssertionError
 
+    def test_duplicates_found_in_single_query(self):
+        """
+        Taken phone number and email are both found with one query,
+        ignoring guests and the excluded user.
+        """
+        user = self.create_test_user()
+        self.create_test_guest_user()
+        phone_number, email = user.phone_number, user.email
+        cases = [
+            ((phone_number, email), {'phone_number', 'email'}),
+            ((phone_number, '1' + email), {'phone_number'}),
+            ((phone_number + '1', email), {'email'}),
+            ((phone_number + '1', '1' + email), set()),
+            ((phone_number, email, user.pk), set()),
+        ]
+        for args, expected in cases:
+            with self.assertNumQueries(1):
+                self.assertEqual(
+                    USER_MODEL.objects.find_registered_duplicates(*args),
+                    expected)
+
+    def test_registered_duplicates_rejected_by_database(self):
+        """
+        Registered users' phone numbers and emails are unique in database,
+        guests and empty emails are not restricted.
+        """
+        user = self.create_test_user()
+        duplicate = USER_MODEL.objects.get()
+        duplicate.pk = None
+        with self.assertRaises(utils.IntegrityError):
+            with transaction.atomic():
+                duplicate.save()
+
+        duplicate.phone_number += '1'
+        with self.assertRaises(utils.IntegrityError):
+            with transaction.atomic():
+                duplicate.save()
+
+        for registered_user in (user, duplicate):
+            registered_user.email = ''
+        user.save()
+        duplicate.save()
+        duplicate.pk = None
+        duplicate.is_guest = True
+        duplicate.save()
+
     def test_user_duplicate_guest_number_email(self):
         """
         Users are allowed to have
@@ -122,6 +176,51 @@ class UserModelTests(TestCase, AccountsTestConstants):
         second_guest_user = self.create_test_guest_user()
         self.assertNotEqual(first_guest_user, second_guest_user)
 
+    def test_guest_user_reused_or_created(self):
+        """
+        get_or_create_guest_user reuses a guest with the same
+        details and ignores registered users. Guests with other
+        details are left as they are, as their orders are.
+        """
+        self.create_test_user()
+        guest_dict = self.guest_user_for_create_guest_user
+        first_guest_user = USER_MODEL.objects.get_or_create_guest_user(
+            **guest_dict)
+        self.assertTrue(first_guest_user.is_guest)
+
+        guest_dict['phone_number'] = '+' + guest_dict['phone_number']
+        second_guest_user = USER_MODEL.objects.get_or_create_guest_user(
+            **guest_dict)
+        self.assertEqual(first_guest_user, second_guest_user)
+
+        guest_dict['street'] = 'new street'
+        third_guest_user = USER_MODEL.objects.get_or_create_guest_user(
+            **guest_dict)
+        self.assertNotEqual(first_guest_user, third_guest_user)
+        self.assertEqual(third_guest_user.street, 'new street')
+        first_guest_user.refresh_from_db()
+        self.assertNotEqual(first_guest_user.street, 'new street')
+
+    def test_merge_guest_users(self):
+        """
+        Duplicate guests are merged into the latest one with all orders.
+        """
+        registered_user = self.create_test_user()
+        guest_users = [self.create_test_guest_user() for i in range(3)]
+        moved_guest_user = self.create_test_guest_user()
+        moved_guest_user.street = 'new street'
+        moved_guest_user.save()
+        for user in guest_users + [moved_guest_user, registered_user]:
+            OrderInfo.objects.create(user=user)
+
+        call_command('merge_guest_users', batch_size=1, stdout=StringIO())
+
+        self.assertEqual(USER_MODEL.objects.filter(is_guest=True).count(), 2)
+        guest_user = guest_users[-1]
+        self.assertEqual(OrderInfo.objects.filter(user=guest_user).count(), 3)
+        for user in (moved_guest_user, registered_user):
+            self.assertEqual(OrderInfo.objects.filter(user=user).count(), 1)
+
 
 class AccountsTestCase(TestCase, AccountsTestConstants):
 
@@ -277,6 +376,16 @@ class RegisterViewTests(AccountsTestCase):
         user = auth.get_user(self.client)
         self.assertTrue(user.is_authenticated)
 
+    def test_register_hashes_password_once(self):
+        """
+        Registration logs the new user in without checking
+        the password that was just hashed.
+        """
+        with mock.patch.object(USER_MODEL, 'check_password') as check:
+            self.register_user()
+        check.assert_not_called()
+        self.assertTrue(auth.get_user(self.client).is_authenticated)
+
 
 class LoginViewTests(AccountsTestCase):
 
@@ -404,6 +513,36 @@ class LoginViewTests(AccountsTestCase):
         self.assertTrue(user.is_anonymous)
 
 
+class AuthBackendTests(AccountsTestCase):
+
+    def test_single_column_lookup(self):
+        """
+        Backend looks a user up either by phone number or by email,
+        not both at once.
+        """
+        user = self.create_test_user()
+        password = self.user_for_tests['password1']
+        for username in (user.phone_number, user.email):
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(
+                    auth.authenticate(username=username, password=password),
+                    user)
+            self.assertEqual(len(context.captured_queries), 1)
+            self.assertNotIn(' OR ', context.captured_queries[0]['sql'])
+
+    def test_registered_users_indexes(self):
+        """
+        Phone number and email of registered users are indexed.
+        """
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, USER_MODEL._meta.db_table)
+        for name, column in (('unique_registered_phone', 'phone_number'),
+                             ('registered_email_idx', 'email')):
+            self.assertEqual(constraints[name]['columns'], [column])
+            self.assertTrue(constraints[name]['index'])
+
+
 class ProfileViewTests(AccountsTestCase):
 
     """
@@ -551,6 +690,101 @@ class ProfileViewTests(AccountsTestCase):
         self.assertNotEqual(users[0].email, users[1].email)
 
 
+class OrderHistoryTests(AccountsTestCase):
+
+    PROFILE_URL = reverse('accounts:profile')
+
+    def setUp(self):
+        self.user = self.create_test_user()
+        self.client.force_login(self.user)
+        self.menu_items = {
+            str(item.id): item for item in (
+                MenuItem.objects.create(name=f'Dish{i}', price=10 * i)
+                for i in range(1, 4))}
+
+    def place_orders(self, number):
+        cart = {item_id: 2 for item_id in self.menu_items}
+        return [write_order_to_db(self.user, cart, self.menu_items)
+                for i in range(number)]
+
+    def walk_history(self):
+        ids, pages, params = [], [], {}
+        while True:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(self.PROFILE_URL, params)
+            pages.append(len(context.captured_queries))
+            ids += [order.id for order in response.context['orders']]
+            if response.context['next_cursor'] is None:
+                return ids, pages
+            params = {'before': response.context['next_cursor']}
+
+    def test_orders_listed_newest_first(self):
+        """
+        Orders are paged through newest first, each listed once,
+        and others' orders aren't listed.
+        """
+        orders = self.place_orders(23)
+        other_user = self.user_for_create_user
+        other_user.update(phone_number='54321', email='other@example.com')
+        OrderInfo.objects.create(
+            user=USER_MODEL.objects.create_user(**other_user))
+
+        ids, pages = self.walk_history()
+        self.assertEqual(ids, [order.id for order in reversed(orders)])
+        self.assertEqual(len(pages), 3)
+
+    def test_order_summary_displayed(self):
+        self.place_orders(1)
+        response = self.client.get(self.PROFILE_URL)
+        self.assertContains(response, '6 items,')
+        self.assertContains(response, 'total 120')
+        self.assertContains(response, 'Dish3 &times; 2')
+
+    def test_page_queries_independent_of_history(self):
+        """
+        Pages take the same queries with a short and a long history.
+        """
+        self.place_orders(3)
+        ids, short_pages = self.walk_history()
+        self.place_orders(30)
+        ids, long_pages = self.walk_history()
+        self.assertEqual(set(long_pages), {short_pages[0]})
+
+    def test_malformed_cursor(self):
+        for cursor in ('first', f'{10 ** 30}-1', f'1-{10 ** 30}'):
+            response = self.client.get(self.PROFILE_URL, {'before': cursor})
+            self.assertEqual(response.status_code, 400)
+
+    def test_order_history_index(self):
+        indexes = [index.name for index in OrderInfo._meta.indexes]
+        self.assertIn('order_history_idx', indexes)
+
+
+class UserChangeFormTests(AccountsTestCase):
+
+    def test_registered_duplicates_rejected(self):
+        """
+        Admin change form doesn't give a registered user
+        another registered user's phone number or email.
+        """
+        user = self.create_test_user()
+        other_user = self.user_for_create_user
+        other_user.update(phone_number='54321', email='other@example.com')
+        other_user = USER_MODEL.objects.create_user(**other_user)
+
+        data = {field: getattr(user, field)
+                for field in UserChangeForm.Meta.fields}
+        data.update(phone_number='54321', email='other@example.com')
+        form = UserChangeForm(
+            data, instance=user, initial={'password': user.password})
+        self.assertEqual(set(form.errors), {'phone_number', 'email'})
+
+        data.update(phone_number=user.phone_number, email=user.email)
+        form = UserChangeForm(
+            data, instance=user, initial={'password': user.password})
+        self.assertTrue(form.is_valid())
+
+
 class PasswordChangeViewTests(AccountsTestCase):
 
     def test_password_change_login_required(self):
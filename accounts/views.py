@@ -1,17 +1,22 @@
 from django.contrib import auth
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse_lazy
-from django.contrib.auth import login, authenticate
+from django.contrib.auth import login
 from django.shortcuts import render, redirect
+from django.http import HttpResponseBadRequest
+from django.db import transaction, IntegrityError
+from django.conf import settings
 
 from .forms import UserCreationForm, UserUpdateForm, CustomAuthForm
+from orders.history import order_history
 SUCCESS_REG_REDIRECT = 'accounts:profile'
 
 
 @login_required
 def profile(request):
     """
-    Render a populated form with user's info, which can be updated.
+    Render a populated form with user's info, which can be updated,
+    and a page of their orders, older ones paged with 'before' cursor.
     """
     if request.method == 'POST':
         form = UserUpdateForm(request.POST, instance=request.user)
@@ -20,7 +25,16 @@ def profile(request):
             return redirect('accounts:profile')
     else:
         form = UserUpdateForm(instance=request.user)
-    return render(request, 'registration/profile.html', {'form': form})
+    try:
+        orders, next_cursor = order_history(
+            request.user, request.GET.get('before'))
+    except ValueError:
+        return HttpResponseBadRequest()
+    return render(request, 'registration/profile.html', {
+        'form': form,
+        'orders': orders,
+        'next_cursor': next_cursor,
+    })
 
 
 class CustomPasswordChangeView(auth.views.PasswordChangeView):
@@ -31,11 +45,18 @@ def registration(request):
     if request.method == 'POST':
         form = UserCreationForm(request.POST)
         if form.is_valid():
-            form.save()
-            username = form.cleaned_data.get('phone_number')
-            raw_password = form.cleaned_data.get('password1')
-            user = authenticate(username=username, password=raw_password)
-            login(request, user)
+            try:
+                with transaction.atomic():
+                    user = form.save()
+            except IntegrityError:
+                # registered concurrently after the form was validated
+                form.add_error(
+                    None, "This phone number or email is already registered")
+                return render(
+                    request, 'registration/register.html', {'form': form})
+            # password was just hashed, so it's not checked again
+            # with authenticate()
+            login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
             return redirect(SUCCESS_REG_REDIRECT)
     else:
         form = UserCreationForm()
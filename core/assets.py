@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+import gzip
+import os
+import re
+from io import BytesIO
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSED_EXTENSIONS = ('.css', '.js', '.svg', '.txt', '.json')
+
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_SPACE = re.compile(r'\s+')
+CSS_PUNCTUATION_SPACE = re.compile(r'\s*([{};,])\s*')
+
+
+def minify_css(text):
+    text = CSS_COMMENT.sub('', text)
+    text = CSS_SPACE.sub(' ', text)
+    text = CSS_PUNCTUATION_SPACE.sub(r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    """
+    Drop indentation, blank lines and whole-line comments.
+    Line breaks are kept, as scripts rely on automatic semicolons.
+    """
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(
+        line for line in lines if line and not line.startswith('//'))
+
+
+MINIFIERS = {
+    '.css': (minify_css, '\n'),
+    # a separating semicolon keeps a file from continuing the previous one
+    '.js': (minify_js, '\n;\n'),
+}
+
+
+def compress(data):
+    """
+    Return (extension, contents) of compressed siblings of a file.
+    Brotli is used when the optional brotli package is installed.
+    """
+    output = BytesIO()
+    # a fixed mtime keeps output reproducible, gzip.compress()
+    # only takes it from Python 3.8
+    with gzip.GzipFile(
+            fileobj=output, mode='wb', compresslevel=9, mtime=0) as gz_file:
+        gz_file.write(data)
+    compressed = [('.gz', output.getvalue())]
+    if brotli is not None:
+        compressed.append(('.br', brotli.compress(data)))
+    return compressed
+
+
+class AssetsStorage(ManifestStaticFilesStorage):
+    """
+    Collected static files get content-hashed names, STATIC_BUNDLES are
+    concatenated and minified before hashing, and text files get gzip
+    and brotli siblings, so they can be served with year-long cache
+    headers by a web server serving precompressed files.
+    """
+
+    def stored_name(self, name):
+        # nothing is collected, e.g. in development or tests
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name, sources in settings.STATIC_BUNDLES.items():
+                self.build_bundle(name, sources)
+                paths[name] = (self, name)
+
+        yield from super().post_process(paths, dry_run, **options)
+
+        if not dry_run:
+            for name in set(self.hashed_files.values()):
+                if name.endswith(COMPRESSED_EXTENSIONS):
+                    self.compress_file(name)
+
+    def build_bundle(self, name, sources):
+        minify, separator = MINIFIERS[os.path.splitext(name)[1]]
+        contents = []
+        for source in sources:
+            with self.open(source) as source_file:
+                contents.append(minify(source_file.read().decode()))
+        self.replace(name, separator.join(contents).encode())
+
+    def compress_file(self, name):
+        with self.open(name) as original:
+            data = original.read()
+        for extension, compressed in compress(data):
+            if len(compressed) < len(data):
+                self.replace(name + extension, compressed)
+
+    def replace(self, name, data):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(data))
@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+
+from channels.testing import HttpCommunicator
+
+import os
+import tempfile
+from contextlib import contextmanager
+from http.cookies import SimpleCookie
+from time import perf_counter
+
+# seconds an ASGI application may take to answer under load
+ASGI_TIMEOUT = 60
+
+
+@contextmanager
+def benchmark_settings():
+    """
+    Settings for driving views with the test client outside of tests.
+    Unlike setup_test_environment(), template rendering is not
+    instrumented, so it doesn't add to measured numbers.
+    """
+    allowed_hosts = settings.ALLOWED_HOSTS + ['testserver']
+    with override_settings(DEBUG=False, ALLOWED_HOSTS=allowed_hosts):
+        yield
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Run the block against a fresh test database.
+    SQLite test databases are kept on disk rather than in memory,
+    so numbers stay close to the ones of a deployed site.
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    with tempfile.TemporaryDirectory() as tmp_dir, benchmark_settings():
+        if connection.vendor == 'sqlite':
+            test_settings['NAME'] = os.path.join(tmp_dir, 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings['NAME'] = old_test_name
+
+
+class AsgiClient(object):
+    """
+    Send requests to an ASGI application in this process, keeping
+    cookies set by responses, the way the test client drives views.
+    Requests are sent from a running event loop.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.cookies = SimpleCookie()
+
+    async def request(self, method, url, body=b'', headers=()):
+        """
+        Return status, headers decoded to str and body of the response.
+        """
+        cookie = '; '.join(
+            f'{name}={morsel.value}' for name, morsel in self.cookies.items())
+        communicator = HttpCommunicator(
+            self.application, method, url, body,
+            [(b'host', b'testserver'), (b'cookie', cookie.encode()),
+             *headers])
+        response = await communicator.get_response(timeout=ASGI_TIMEOUT)
+        headers = [
+            (name.decode('latin-1'), value.decode('latin-1'))
+            for name, value in response['headers']]
+        for name, value in headers:
+            if name.lower() == 'set-cookie':
+                self.cookies.load(value)
+        return response['status'], headers, response['body']
+
+
+def measure_rate(func, number):
+    """
+    Call func a number of times and return calls per second.
+    """
+    start = perf_counter()
+    for i in range(number):
+        func()
+    return number / (perf_counter() - start)
+
+
+def percentile(sorted_values, percent):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
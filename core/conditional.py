@@ -0,0 +1,42 @@
+from django.contrib import messages
+from django.views.decorators.http import condition
+
+from .version import version_datetime
+
+
+def versioned_page(versions_func):
+    """
+    Answer conditional GETs of a page with 304 Not Modified while
+    versions of the data it shows, returned by versions_func called
+    with view arguments, stay the same. versions_func returns None
+    when the page can't be validated, e.g. its object doesn't exist.
+
+    Versions of pages rendered from templates include the build
+    version, so pages cached before a deploy, linking static files
+    by names it replaced, aren't answered with 304 after it.
+
+    Pages must not render per-session data, which is fetched
+    by scripts instead. Pages with pending messages are always
+    rendered in full, so the messages aren't cached with them.
+    """
+    def get_versions(request, *args, **kwargs):
+        # computed once for both validators
+        if not hasattr(request, 'page_versions'):
+            if len(messages.get_messages(request)):
+                request.page_versions = None
+            else:
+                request.page_versions = versions_func(
+                    request, *args, **kwargs)
+        return request.page_versions
+
+    def etag_func(request, *args, **kwargs):
+        versions = get_versions(request, *args, **kwargs)
+        if versions is not None:
+            return '-'.join(str(version) for version in versions)
+
+    def last_modified_func(request, *args, **kwargs):
+        versions = get_versions(request, *args, **kwargs)
+        if versions is not None:
+            return version_datetime(max(versions))
+
+    return condition(etag_func, last_modified_func)
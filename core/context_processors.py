@@ -1,6 +1,14 @@
+from django.conf import settings
+from django.core.cache import caches
 from django.urls import reverse
 
 from .models import InfoViewTemplate
+from .version import get_info_version
+
+NAVBAR_CACHE_KEY = 'core:navbar_views'
+
+# process-local navbar cache, used when NAVBAR_CACHE_ALIAS is None
+_navbar_cache = {}
 
 
 def info_views_processor(request):
@@ -8,7 +16,7 @@ def info_views_processor(request):
     return {'info_views': info_views}
 
 
-def navbar_views_processor(request):
+def build_navbar_views():
     info_views = InfoViewTemplate.objects.all()
 
     menu_views = [
@@ -27,4 +35,49 @@ def navbar_views_processor(request):
             'title': view.title,
             'url': reverse('core:info', args=(view.view_name,))
         })
-    return {'navbar_views': menu_views}
+    return menu_views
+
+
+def _get_navbar_cache():
+    """
+    Return the Django cache navbar views are shared in between
+    processes, or the process-local dict if no alias is set.
+    """
+    alias = getattr(settings, 'NAVBAR_CACHE_ALIAS', 'default')
+    if alias is None:
+        return _navbar_cache
+    return caches[alias]
+
+
+def get_navbar_views():
+    """
+    Return cached navbar views, building them on a cache miss.
+    Process-local views are stored with the info version they were
+    built at, so changes saved by other processes rebuild them too.
+    """
+    cache = _get_navbar_cache()
+    if cache is not _navbar_cache:
+        menu_views = cache.get(NAVBAR_CACHE_KEY)
+        if menu_views is None:
+            menu_views = build_navbar_views()
+            cache.set(NAVBAR_CACHE_KEY, menu_views, None)
+        return menu_views
+
+    version = get_info_version()
+    built_version, menu_views = cache.get(NAVBAR_CACHE_KEY, (None, None))
+    if built_version != version:
+        menu_views = build_navbar_views()
+        cache[NAVBAR_CACHE_KEY] = (version, menu_views)
+    return menu_views
+
+
+def invalidate_navbar_views():
+    cache = _get_navbar_cache()
+    if cache is _navbar_cache:
+        cache.pop(NAVBAR_CACHE_KEY, None)
+    else:
+        cache.delete(NAVBAR_CACHE_KEY)
+
+
+def navbar_views_processor(request):
+    return {'navbar_views': get_navbar_views()}
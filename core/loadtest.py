@@ -0,0 +1,153 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import random
+from collections import OrderedDict
+from time import perf_counter
+
+from .benchmark import percentile
+from menu.models import MenuItem
+
+USER_MODEL = get_user_model()
+
+LOADTEST_PASSWORD = 'loadtestpassword'
+ORDER_FORM = {
+    'first_name': 'Load',
+    'second_name': 'Test',
+    'street': 'Test street',
+    'house': '1',
+    'apartment': '',
+}
+
+
+class EndpointStats(object):
+    """
+    Latencies and query counts of requests to a single endpoint.
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self.queries = []
+
+    def record(self, latency, queries):
+        self.latencies.append(latency)
+        self.queries.append(queries)
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        total = sum(latencies)
+        return {
+            'requests': len(latencies),
+            'throughput': len(latencies) / total if total else None,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'queries': sum(self.queries) / len(self.queries),
+        }
+
+
+class LoadTest(object):
+    """
+    Walk the browse, cart and checkout funnel with the test client
+    as guests and logged-in users, recording stats per endpoint.
+    """
+
+    def __init__(self, clicks=5, seed=0):
+        self.clicks = clicks
+        self.random = random.Random(seed)
+        self.stats = OrderedDict()
+        self.funnels = 0
+        self.elapsed = 0
+
+    def request(self, client, method, url_name, data=None, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            start = perf_counter()
+            response = getattr(client, method)(
+                reverse(url_name), data, **kwargs)
+            latency = perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f"{method.upper()} {url_name} "
+                f"returned {response.status_code}")
+        key = f'{method.upper()} {url_name}'
+        self.stats.setdefault(key, EndpointStats()).record(
+            latency, len(context.captured_queries))
+        return response
+
+    def run(self, guest_funnels, user_funnels):
+        """
+        Run a number of funnels of each kind, interleaved.
+        """
+        self.item_ids = list(MenuItem.objects.filter(
+            available=True).values_list('id', flat=True))
+        if not self.item_ids:
+            raise RuntimeError("No available menu items to order.")
+
+        users = [self.create_user() for i in range(user_funnels)]
+        funnels = [None] * guest_funnels + users
+        self.random.shuffle(funnels)
+
+        start = perf_counter()
+        for user in funnels:
+            self.run_funnel(user)
+        self.elapsed += perf_counter() - start
+        self.funnels += len(funnels)
+
+    def run_funnel(self, user=None):
+        client = Client()
+        if user is None:
+            order_form = dict(ORDER_FORM, phone_number=self.phone_number())
+        else:
+            client.force_login(user)
+            order_form = dict(ORDER_FORM, phone_number=user.phone_number)
+
+        self.view_page(client, 'menu:menu')
+        for i in range(self.clicks):
+            self.request(client, 'get', 'menu:update_cart', {
+                'item_id': self.random.choice(self.item_ids),
+                'action': 'increase'
+            })
+        self.request(client, 'get', 'orders:shopping_cart')
+        self.request(client, 'get', 'orders:checkout')
+        response = self.request(
+            client, 'post', 'orders:checkout', order_form)
+        if b'Your order was placed.' not in response.content:
+            raise RuntimeError("Order was not placed.")
+
+    def view_page(self, client, url_name):
+        """
+        Cacheable pages fetch cart state of the session
+        with a request of their own, as a browser does.
+        """
+        self.request(client, 'get', url_name)
+        self.request(client, 'get', 'menu:cart_state')
+
+    def phone_number(self):
+        return str(self.random.randrange(10 ** 9, 10 ** 10))
+
+    def create_user(self):
+        """
+        Password is hashed here, outside of measured requests.
+        """
+        phone_number = self.phone_number()
+        while USER_MODEL.objects.filter(
+                phone_number=phone_number, is_guest=False).exists():
+            phone_number = self.phone_number()
+        return USER_MODEL.objects.create_user(
+            phone_number=phone_number, password=LOADTEST_PASSWORD,
+            **ORDER_FORM)
+
+    def report(self):
+        """
+        Return overall funnel throughput and a summary per endpoint.
+        """
+        return {
+            'funnels': self.funnels,
+            'funnels_per_second': (
+                self.funnels / self.elapsed if self.elapsed else None),
+            'endpoints': OrderedDict(
+                (key, stats.summary()) for key, stats in self.stats.items()),
+        }
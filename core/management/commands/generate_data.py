@@ -0,0 +1,195 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from menu.models import MenuItem, MenuSpecial
+from orders.models import OrderInfo, OrderContents, MAX_ORDER_VOLUME
+
+USER_MODEL = get_user_model()
+
+GENERATED_PASSWORD = 'generatedpassword'
+# recent orders are still being cooked or delivered
+OPEN_ORDERS_PERIOD = timedelta(hours=2)
+
+
+def next_pk(model):
+    return (model.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1
+
+
+@contextmanager
+def ordered_date_settable():
+    """
+    OrderInfo.ordered is auto_now_add, which would set every
+    generated order to now.
+    """
+    field = OrderInfo._meta.get_field('ordered')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate menu items, specials, registered and guest users "
+        "and orders with their contents. The same seed generates the same "
+        "data, with dates relative to the start of the current day.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--menu-items', type=int, default=200)
+        parser.add_argument('--specials', type=int, default=10)
+        parser.add_argument(
+            '--users', type=int, default=2000,
+            help="Number of registered users.")
+        parser.add_argument('--guests', type=int, default=5000)
+        parser.add_argument('--orders', type=int, default=100000)
+        parser.add_argument(
+            '--max-lines', type=int, default=5,
+            help="Maximum number of distinct menu items in an order.")
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help="Orders are spread over this number of past days.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help="Number of rows inserted per query and transaction.")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        menu_items = self.generate_menu_items(options['menu_items'])
+        self.generate_specials(options['specials'])
+        user_ids = self.generate_users(options['users'], is_guest=False)
+        user_ids += self.generate_users(options['guests'], is_guest=True)
+        if options['orders'] and not (menu_items and user_ids):
+            self.stderr.write("Orders need menu items and users.")
+        else:
+            with ordered_date_settable():
+                self.generate_orders(
+                    options['orders'], menu_items, user_ids,
+                    options['max_lines'], options['days'])
+        self.reset_sequences()
+
+        self.stdout.write(
+            f"Generated {options['menu_items']} menu items, "
+            f"{options['specials']} specials, {options['users']} users, "
+            f"{options['guests']} guests and {options['orders']} orders.")
+
+    def bulk_create(self, model, objects):
+        """
+        Insert objects in batches, each in its own transaction.
+        """
+        for start in range(0, len(objects), self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    objects[start:start + self.batch_size])
+
+    def generate_menu_items(self, number):
+        # primary keys are set here, as SQLite doesn't return them
+        # from bulk inserts, and used in unique names
+        first_pk = next_pk(MenuItem)
+        menu_items = [
+            MenuItem(
+                pk=pk, name=f'Dish {pk}', price=self.random.randint(10, 500),
+                available=self.random.random() < 0.9)
+            for pk in range(first_pk, first_pk + number)]
+        self.bulk_create(MenuItem, menu_items)
+        return [item for item in menu_items if item.available]
+
+    def generate_specials(self, number):
+        first_pk = next_pk(MenuSpecial)
+        self.bulk_create(MenuSpecial, [
+            MenuSpecial(pk=pk, name=f'Special {pk}')
+            for pk in range(first_pk, first_pk + number)])
+
+    def generate_users(self, number, is_guest):
+        if is_guest:
+            password, phone_prefix = None, '2'
+        else:
+            # hashing is slow, so all registered users share a hash
+            password, phone_prefix = make_password(GENERATED_PASSWORD), '1'
+
+        first_pk = next_pk(USER_MODEL)
+        users = []
+        for pk in range(first_pk, first_pk + number):
+            users.append(USER_MODEL(
+                pk=pk,
+                phone_number=f'{phone_prefix}{pk:010}',
+                password=password or make_password(None),
+                first_name=f'First{pk}',
+                second_name=f'Second{pk}',
+                email=f'user{pk}@example.com',
+                street=f'Street {self.random.randint(1, 300)}',
+                house=str(self.random.randint(1, 100)),
+                apartment=str(self.random.randint(1, 200)),
+                is_guest=is_guest))
+        self.bulk_create(USER_MODEL, users)
+        return [user.pk for user in users]
+
+    def generate_orders(self, number, menu_items, user_ids, max_lines, days):
+        today = timezone.now().replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        period = timedelta(days=days).total_seconds()
+        offsets = sorted(
+            self.random.uniform(0, period) for i in range(number))
+
+        first_pk = next_pk(OrderInfo)
+        for start in range(0, number, self.batch_size):
+            orders = []
+            contents = []
+            batch = offsets[start:start + self.batch_size]
+            for pk, offset in enumerate(batch, first_pk + start):
+                user_id = self.random.choice(user_ids)
+                # generated names are derived from user primary keys
+                order = OrderInfo(
+                    pk=pk, user_id=user_id,
+                    customer_name=f'First{user_id} Second{user_id}',
+                    ordered=today - timedelta(seconds=period - offset))
+                self.set_state(order, today)
+
+                lines = self.random.sample(
+                    menu_items,
+                    self.random.randint(1, min(max_lines, len(menu_items))))
+                for menu_item in lines:
+                    amount = self.random.randint(1, MAX_ORDER_VOLUME // 4)
+                    contents.append(OrderContents(
+                        order_id=pk, menu_item_id=menu_item.pk,
+                        amount=amount, cost=amount * menu_item.price))
+                    order.total_cost += contents[-1].cost
+                    order.item_count += amount
+                orders.append(order)
+
+            with transaction.atomic():
+                OrderInfo.objects.bulk_create(orders)
+                OrderContents.objects.bulk_create(contents)
+
+    def set_state(self, order, now):
+        cooked = order.ordered + timedelta(
+            minutes=self.random.randint(15, 40))
+        delivered = cooked + timedelta(minutes=self.random.randint(15, 60))
+        if now - order.ordered > OPEN_ORDERS_PERIOD:
+            order.cooked, order.delivered = cooked, delivered
+            order.status = OrderInfo.DELIVERED
+        elif cooked < now:
+            order.cooked = cooked
+            order.status = OrderInfo.COOKED
+
+    def reset_sequences(self):
+        """
+        Explicit primary keys don't advance sequences of some databases.
+        """
+        sql_list = connection.ops.sequence_reset_sql(
+            no_style(), [MenuItem, MenuSpecial, USER_MODEL, OrderInfo])
+        with connection.cursor() as cursor:
+            for sql in sql_list:
+                cursor.execute(sql)
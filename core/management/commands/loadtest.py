@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand, CommandError
+
+import json
+import random
+from contextlib import contextmanager
+
+from core.benchmark import benchmark_database, benchmark_settings
+from core.loadtest import LoadTest
+from menu.models import MenuItem
+
+ROW = '{:<32} {:>9} {:>9} {:>9} {:>9} {:>9} {:>9}'
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the browse, cart and checkout funnel with the test client "
+        "and report throughput, latency percentiles and queries "
+        "per request for each endpoint.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--guests', type=int, default=50,
+            help="Number of funnels run by anonymous guests.")
+        parser.add_argument(
+            '--users', type=int, default=50,
+            help="Number of funnels run by logged-in users.")
+        parser.add_argument(
+            '--clicks', type=int, default=5,
+            help="Number of update_cart clicks per funnel.")
+        parser.add_argument(
+            '--menu-items', type=int, default=30,
+            help="Number of menu items seeded in a throwaway database.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--existing-db', action='store_true',
+            help=("Run against the configured database, e.g. one filled "
+                  "by generate_data, which must have available menu "
+                  "items. Users and orders are written to it."))
+        parser.add_argument(
+            '--json', action='store_true',
+            help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        load_test = LoadTest(clicks=options['clicks'], seed=options['seed'])
+        with self.database(options):
+            try:
+                load_test.run(options['guests'], options['users'])
+            except RuntimeError as error:
+                raise CommandError(error)
+        report = load_test.report()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(
+            f"{report['funnels']} funnels, "
+            f"{report['funnels_per_second']:.1f} funnels/s")
+        self.stdout.write(ROW.format(
+            'endpoint', 'requests', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms',
+            'queries'))
+        for endpoint, summary in report['endpoints'].items():
+            self.stdout.write(ROW.format(
+                endpoint, summary['requests'],
+                f"{summary['throughput']:.1f}",
+                f"{summary['p50_ms']:.2f}",
+                f"{summary['p95_ms']:.2f}",
+                f"{summary['p99_ms']:.2f}",
+                f"{summary['queries']:.1f}"))
+
+    @contextmanager
+    def database(self, options):
+        if options['existing_db']:
+            with benchmark_settings():
+                yield
+            return
+        with benchmark_database():
+            rng = random.Random(options['seed'])
+            MenuItem.objects.bulk_create(
+                MenuItem(name=f'Dish{i}', price=rng.randint(10, 300))
+                for i in range(options['menu_items']))
+            yield
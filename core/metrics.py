@@ -0,0 +1,155 @@
+from django.template.base import Template
+
+import threading
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+
+# upper bounds of histogram buckets, the last bucket has no bound
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_local = threading.local()
+_lock = threading.Lock()
+_view_stats = {}
+
+
+class RequestMetrics(object):
+    """
+    Costs of a single request, collected while it's being handled.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0
+        self.template_time = 0
+        self.session_time = 0
+        self.depth = {}
+
+    def record_query(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += perf_counter() - start
+            self.queries += 1
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'sql_ms': self.sql_time * 1000,
+            'template_ms': self.template_time * 1000,
+            'session_ms': self.session_time * 1000,
+        }
+
+
+class ViewStats(object):
+    """
+    Aggregated costs of requests to a single view.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.totals = {
+            'duration_ms': 0,
+            'queries': 0,
+            'sql_ms': 0,
+            'template_ms': 0,
+            'session_ms': 0,
+        }
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.query_histogram = [0] * (len(QUERY_BUCKETS) + 1)
+
+    def record(self, record):
+        self.count += 1
+        for key in self.totals:
+            self.totals[key] += record[key]
+        self.latency_histogram[
+            bisect_left(LATENCY_BUCKETS_MS, record['duration_ms'])] += 1
+        self.query_histogram[
+            bisect_left(QUERY_BUCKETS, record['queries'])] += 1
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean': {key: total / self.count
+                     for key, total in self.totals.items()},
+            'latency_histogram_ms': histogram(
+                LATENCY_BUCKETS_MS, self.latency_histogram),
+            'query_histogram': histogram(
+                QUERY_BUCKETS, self.query_histogram),
+        }
+
+
+def histogram(bounds, counts):
+    """
+    Pair bucket counts with their upper bounds, '+Inf' for the last one.
+    """
+    labels = [str(bound) for bound in bounds] + ['+Inf']
+    return dict(zip(labels, counts))
+
+
+def start_request():
+    _local.metrics = RequestMetrics()
+    return _local.metrics
+
+
+def finish_request():
+    _local.metrics = None
+
+
+def record_view(view_name, record):
+    with _lock:
+        _view_stats.setdefault(view_name, ViewStats()).record(record)
+
+
+def get_view_metrics():
+    with _lock:
+        return {view_name: stats.as_dict()
+                for view_name, stats in sorted(_view_stats.items())}
+
+
+def reset_view_metrics():
+    with _lock:
+        _view_stats.clear()
+
+
+def timed(method, attr):
+    """
+    Wrap a method to add its time to an attribute of current
+    request metrics. Nested calls, e.g. included templates,
+    are counted once.
+    """
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        metrics = getattr(_local, 'metrics', None)
+        if metrics is None or metrics.depth.get(attr):
+            return method(*args, **kwargs)
+        metrics.depth[attr] = 1
+        start = perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            setattr(metrics, attr,
+                    getattr(metrics, attr) + perf_counter() - start)
+            metrics.depth[attr] = 0
+    wrapper.metrics_timed = True
+    return wrapper
+
+
+def instrument(cls, method_name, attr):
+    """
+    Time a method of a class, once however many times it's called.
+    """
+    method = getattr(cls, method_name)
+    if not getattr(method, 'metrics_timed', False):
+        setattr(cls, method_name, timed(method, attr))
+
+
+def instrument_templates():
+    instrument(Template, 'render', 'template_time')
+
+
+def instrument_sessions(session_store):
+    for method_name in ('load', 'save'):
+        instrument(session_store, method_name, 'session_time')
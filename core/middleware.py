@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+import json
+import logging
+from importlib import import_module
+from time import perf_counter
+
+from . import metrics
+
+logger = logging.getLogger('core.metrics')
+
+
+class ViewMetricsMiddleware(object):
+    """
+    Record query count, SQL, template rendering and session time
+    of every request, aggregated by URL name.
+    Should be placed above SessionMiddleware to time session saving.
+    Removed from the chain unless VIEW_METRICS_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'VIEW_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        metrics.instrument_templates()
+        metrics.instrument_sessions(
+            import_module(settings.SESSION_ENGINE).SessionStore)
+
+    def __call__(self, request):
+        request_metrics = metrics.start_request()
+        start = perf_counter()
+        try:
+            with connection.execute_wrapper(request_metrics.record_query):
+                response = self.get_response(request)
+        finally:
+            metrics.finish_request()
+        duration = perf_counter() - start
+
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        record = dict(request_metrics.as_dict(), duration_ms=duration * 1000)
+        metrics.record_view(view_name, record)
+        logger.info(json.dumps(dict(
+            record, view=view_name, method=request.method,
+            status=response.status_code)))
+        return response
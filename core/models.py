@@ -10,11 +10,15 @@ class InfoViewTemplate(models.Model):
     view_name = models.CharField(max_length=64, unique=True)
     title = models.CharField(max_length=64, unique=True, blank=True)
     template_name = models.CharField(max_length=64, unique=True, blank=True)
+    last_modified = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
         if self.title == '':
             self.title = capwords(self.view_name)
         if self.template_name == '':
             self.template_name = DEFAULT_TEMPLATE
-        self.template_name = f'{TEMPLATES_FOLDER}{self.template_name}.html'
+        if not self.template_name.startswith(TEMPLATES_FOLDER):
+            # a saved template name is already a path
+            self.template_name = (
+                f'{TEMPLATES_FOLDER}{self.template_name}.html')
         super().save(*args, **kwargs)
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import InfoViewTemplate
+from .context_processors import invalidate_navbar_views
+from .version import bump_info_version
+
+
+@receiver([post_save, post_delete], sender=InfoViewTemplate)
+def info_view_changed(sender, **kwargs):
+    """
+    Navbar lists info views, so it's rebuilt on their change,
+    and every page showing it gets a new version.
+    """
+    invalidate_navbar_views()
+    bump_info_version()
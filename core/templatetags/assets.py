@@ -0,0 +1,34 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+register = template.Library()
+
+TAGS = {
+    '.js': '<script type="text/javascript" src="{}" defer></script>',
+    '.css': '<link rel="stylesheet" href="{}">',
+}
+
+
+def is_built(name):
+    """
+    Bundles are built by collectstatic, in development
+    their source files are linked instead, so edits show up.
+    """
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    return not settings.DEBUG and name in hashed_files
+
+
+@register.simple_tag
+def bundle(name):
+    """
+    Link a bundle of STATIC_BUNDLES, or its source files until it's built.
+    """
+    if is_built(name):
+        names = [name]
+    else:
+        names = settings.STATIC_BUNDLES[name]
+    tag = TAGS['.js' if name.endswith('.js') else '.css']
+    return format_html_join('\n', tag, ((static(path),) for path in names))
@@ -0,0 +1,24 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+import shutil
+import tempfile
+
+
+class TempMediaTestRunner(DiscoverRunner):
+    """
+    Run tests with MEDIA_ROOT in a temporary folder removed afterwards,
+    so uploads and image derivatives saved by tests, e.g. by the
+    derivatives worker, don't end up among the site's media.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.media_root = tempfile.mkdtemp()
+        self.media_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.media_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.media_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -1,7 +1,30 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.conf import settings
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.db.models import Sum
+
+from io import StringIO
 from django.urls import reverse
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+import gzip
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
 
 from .models import InfoViewTemplate
+from .context_processors import get_navbar_views, invalidate_navbar_views
+from .version import compute_build_digest
+from .loadtest import LoadTest
+from .metrics import get_view_metrics, reset_view_metrics
+from .assets import compress, minify_css, minify_js
+from menu.models import MenuItem, MenuSpecial
+from orders.models import OrderInfo, OrderContents
 
 
 class DeliveryViewsTests(TestCase):
@@ -40,3 +63,347 @@ class InfoViewTests(TestCase):
 
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
+
+    def test_info_view_not_modified(self):
+        """
+        Info pages answer conditional requests until info views change.
+        """
+        info_view = InfoViewTemplate.objects.create(view_name='about')
+        url = reverse('core:info', args=('about',))
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        info_view.title = 'About us'
+        info_view.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'About us')
+
+    def test_info_view_modified_by_deploy(self):
+        """
+        Pages cached before a deploy changing templates or static
+        files are rendered again.
+        """
+        InfoViewTemplate.objects.create(view_name='about')
+        url = reverse('core:info', args=('about',))
+        response = self.client.get(url)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        # deployed a minute later
+        deploy = mock.patch.multiple(
+            'core.version', cached_build_digest=lambda: 'new build')
+        deployed = time.time_ns() + 60 * 10 ** 9
+        with deploy, mock.patch('time.time_ns', return_value=deployed):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, 200)
+
+
+class BuildVersionTests(TestCase):
+
+    def test_build_digest_follows_templates(self):
+        """
+        Editing a template changes the build digest.
+        """
+        with tempfile.TemporaryDirectory() as template_dir:
+            templates = [{**settings.TEMPLATES[0], 'DIRS': [template_dir]}]
+            path = os.path.join(template_dir, 'page.html')
+            with override_settings(TEMPLATES=templates):
+                with open(path, 'w') as template:
+                    template.write('old')
+                old_digest = compute_build_digest()
+                with open(path, 'w') as template:
+                    template.write('new')
+                self.assertNotEqual(compute_build_digest(), old_digest)
+
+
+class NavbarCacheTests(TestCase):
+    """
+    Tests for cached navbar views.
+    """
+
+    def setUp(self):
+        invalidate_navbar_views()
+
+    def get_navbar_titles(self):
+        return [view['title'] for view in get_navbar_views()]
+
+    def test_navbar_cached(self):
+        """
+        Navbar views are built once and then served without queries.
+        """
+        with self.assertNumQueries(1):
+            get_navbar_views()
+        with self.assertNumQueries(0):
+            get_navbar_views()
+
+    def test_navbar_updated_on_save(self):
+        """
+        Saving an info view template updates cached navbar.
+        """
+        self.assertNotIn('New Page', self.get_navbar_titles())
+        info_view = InfoViewTemplate.objects.create(view_name='new page')
+        self.assertIn('New Page', self.get_navbar_titles())
+
+        info_view.title = 'Renamed Page'
+        info_view.save()
+        self.assertIn('Renamed Page', self.get_navbar_titles())
+
+    def test_navbar_updated_on_delete(self):
+        """
+        Deleting an info view template removes it from cached navbar.
+        """
+        info_view = InfoViewTemplate.objects.create(view_name='new page')
+        self.assertIn('New Page', self.get_navbar_titles())
+        info_view.delete()
+        self.assertNotIn('New Page', self.get_navbar_titles())
+
+    @override_settings(NAVBAR_CACHE_ALIAS=None)
+    def test_navbar_in_process_memory(self):
+        """
+        Without a cache alias, navbar views are stored in process memory.
+        """
+        invalidate_navbar_views()
+        with self.assertNumQueries(1):
+            get_navbar_views()
+        with self.assertNumQueries(0):
+            get_navbar_views()
+        InfoViewTemplate.objects.create(view_name='new page')
+        self.assertIn('New Page', self.get_navbar_titles())
+        invalidate_navbar_views()
+
+    @override_settings(NAVBAR_CACHE_ALIAS=None)
+    def test_navbar_in_process_memory_follows_info_version(self):
+        """
+        Navbar views cached in process memory are rebuilt after
+        info views are changed by another process, which only
+        bumps the shared info version.
+        """
+        self.get_navbar_titles()
+        with mock.patch('core.signals.invalidate_navbar_views'):
+            InfoViewTemplate.objects.create(view_name='new page')
+        self.assertIn('New Page', self.get_navbar_titles())
+        invalidate_navbar_views()
+
+
+class LoadTestTests(TestCase):
+
+    def test_funnels_recorded(self):
+        """
+        Guest and user funnels place orders and
+        stats are reported for each endpoint.
+        """
+        for i in range(3):
+            MenuItem.objects.create(name=f'Dish{i}', price=10)
+        load_test = LoadTest(clicks=2)
+        load_test.run(guest_funnels=1, user_funnels=1)
+        report = load_test.report()
+
+        self.assertEqual(report['funnels'], 2)
+        self.assertEqual(OrderInfo.objects.count(), 2)
+        self.assertEqual(
+            report['endpoints']['GET menu:update_cart']['requests'], 4)
+        for endpoint in ('GET menu:menu', 'GET menu:cart_state',
+                         'GET orders:shopping_cart',
+                         'GET orders:checkout', 'POST orders:checkout'):
+            summary = report['endpoints'][endpoint]
+            self.assertEqual(summary['requests'], 2)
+            self.assertLessEqual(summary['p50_ms'], summary['p99_ms'])
+
+    def test_no_menu_items(self):
+        """
+        Load test can't run without menu items to order.
+        """
+        with self.assertRaises(RuntimeError):
+            LoadTest().run(guest_funnels=1, user_funnels=0)
+
+
+class GenerateDataTests(TestCase):
+
+    SIZES = {
+        'menu_items': 10,
+        'specials': 2,
+        'users': 5,
+        'guests': 5,
+        'orders': 30,
+        'batch_size': 7,
+    }
+
+    def generate(self, seed=0):
+        call_command('generate_data', seed=seed, stdout=StringIO(),
+                     **self.SIZES)
+
+    def dump(self):
+        """
+        Generated values independent of primary keys.
+        """
+        return (
+            list(MenuItem.objects.order_by('pk').values_list(
+                'price', 'available')),
+            list(OrderInfo.objects.order_by('pk').values_list(
+                'total_cost', 'ordered', 'status', 'cooked', 'delivered')),
+            list(OrderContents.objects.order_by('pk').values_list(
+                'amount', 'cost')),
+        )
+
+    def test_volumes_generated(self):
+        """
+        Requested numbers of rows are generated with consistent costs.
+        """
+        self.generate()
+        user_model = get_user_model()
+        self.assertEqual(MenuItem.objects.count(), 10)
+        self.assertEqual(MenuSpecial.objects.count(), 2)
+        self.assertEqual(user_model.objects.filter(is_guest=False).count(), 5)
+        self.assertEqual(user_model.objects.filter(is_guest=True).count(), 5)
+        self.assertEqual(OrderInfo.objects.count(), 30)
+        for order in OrderInfo.objects.annotate(
+                lines_cost=Sum('ordercontents__cost')):
+            self.assertEqual(order.total_cost, order.lines_cost)
+        # status agrees with timestamps
+        self.assertFalse(OrderInfo.objects.filter(
+            status=OrderInfo.ORDERED, cooked__isnull=False).exists())
+        self.assertFalse(OrderInfo.objects.exclude(
+            status=OrderInfo.DELIVERED).filter(
+            delivered__isnull=False).exists())
+
+        # further rows get new primary keys
+        MenuItem.objects.create(name='New Dish', price=10)
+
+    def test_generation_deterministic(self):
+        """
+        The same seed generates the same data.
+        """
+        self.generate(seed=1)
+        first_dump = self.dump()
+        MenuItem.objects.all().delete()
+        OrderInfo.objects.all().delete()
+        self.generate(seed=1)
+        self.assertEqual(first_dump, self.dump())
+
+
+class ViewMetricsTests(TestCase):
+
+    def setUp(self):
+        reset_view_metrics()
+
+    @override_settings(VIEW_METRICS_ENABLED=True)
+    def test_metrics_recorded_by_url_name(self):
+        """
+        Requests are aggregated by URL name with their costs
+        and logged one line each.
+        """
+        MenuItem.objects.create(name='Dish', price=10)
+        with self.assertLogs('core.metrics', 'INFO') as logs:
+            for i in range(2):
+                self.client.get(reverse('menu:menu'))
+            self.client.get(reverse('menu:update_cart'),
+                            {'item_id': MenuItem.objects.get().id,
+                             'action': 'increase'})
+
+        view_metrics = get_view_metrics()
+        menu_metrics = view_metrics['menu:menu']
+        self.assertEqual(menu_metrics['count'], 2)
+        # the second request is served from cached menu fragments
+        self.assertGreater(menu_metrics['mean']['queries'], 0)
+        self.assertGreater(menu_metrics['mean']['template_ms'], 0)
+        self.assertEqual(
+            sum(menu_metrics['latency_histogram_ms'].values()), 2)
+        self.assertGreater(
+            view_metrics['menu:update_cart']['mean']['session_ms'], 0)
+        self.assertEqual(len(logs.records), 3)
+        self.assertIn('"view": "menu:menu"', logs.output[0])
+
+    @override_settings(VIEW_METRICS_ENABLED=True)
+    def test_metrics_written_by_logging_settings(self):
+        """
+        LOGGING passes metrics lines on at INFO, as bare JSON.
+        """
+        handler, = logging.getLogger('core.metrics').handlers
+        with mock.patch.object(handler, 'stream', StringIO()) as stream:
+            self.client.get(reverse('menu:menu'))
+        line, = stream.getvalue().splitlines()
+        self.assertEqual(json.loads(line)['view'], 'menu:menu')
+
+    def test_metrics_disabled(self):
+        """
+        Nothing is recorded unless metrics are enabled.
+        """
+        self.client.get(reverse('menu:menu'))
+        self.assertEqual(get_view_metrics(), {})
+
+    @override_settings(VIEW_METRICS_ENABLED=True)
+    def test_metrics_admin_only(self):
+        """
+        Aggregated metrics are only shown to admins.
+        """
+        url = reverse('core:metrics')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(get_user_model().objects.create_superuser(
+            phone_number='12345', password='testpassword',
+            first_name='first', second_name='second',
+            street='street', house='house'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('core:metrics', response.json())
+
+
+class AssetPipelineTests(TestCase):
+
+    def test_minify_css(self):
+        css = "/* comment */\nbody {\n  margin: 0;\n  color: red;\n}\n"
+        self.assertEqual(minify_css(css), 'body{margin: 0;color: red}')
+
+    def test_minify_js(self):
+        """
+        Line breaks are kept for automatic semicolons.
+        """
+        js = "// comment\nlet a = 1\n\n  let b = 'http://x'\n"
+        self.assertEqual(minify_js(js), "let a = 1\nlet b = 'http://x'")
+
+    def test_compress_reproducible(self):
+        data = b'body{margin: 0}' * 100
+        gz_name, gz_data = compress(data)[0]
+        self.assertEqual(gz_name, '.gz')
+        self.assertEqual(gzip.decompress(gz_data), data)
+        # no timestamp in the header
+        self.assertEqual(gz_data[4:8], bytes(4))
+
+    def test_sources_linked_until_built(self):
+        """
+        Without collected bundles, pages link their source files.
+        """
+        response = self.client.get(reverse('menu:menu'))
+        self.assertContains(response, '/static/menu/menu_script.js')
+        self.assertContains(response, '/static/core/style.css')
+
+    def test_collected_bundles(self):
+        """
+        collectstatic builds hashed, minified and gzipped bundles,
+        which pages link instead of their sources.
+        """
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        with override_settings(STATIC_ROOT=static_root):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            hashed_name = staticfiles_storage.stored_name(
+                'bundles/menu_list.js')
+            self.assertRegex(hashed_name, r'^bundles/menu_list\.\w{12}\.js$')
+
+            path = os.path.join(static_root, hashed_name)
+            with open(path, 'rb') as bundle:
+                contents = bundle.read()
+            self.assertIn(b'function updateCart', contents)
+            self.assertIn(b'function sendUpdates', contents)
+            self.assertNotIn(b'\n//', contents)
+            with gzip.open(path + '.gz') as compressed:
+                self.assertEqual(compressed.read(), contents)
+
+            response = self.client.get(reverse('menu:menu'))
+            self.assertContains(response, f'/static/{hashed_name}')
+            self.assertNotContains(response, '/static/menu/menu_script.js')
@@ -5,11 +5,17 @@ from selenium import webdriver, common
 from time import sleep
 
 from accounts.helpers import LoginBrowserUserMixin
+from menu.version import bump_menu_version
+
+# longer than the delay cart clicks are batched with in menu_script.js
+CART_UPDATE_WAIT = 0.5
 
 
 class DeliveryFirefoxTests(LoginBrowserUserMixin, StaticLiveServerTestCase):
 
     def setUp(self):
+        # cached menu fragments outlive flushed test data
+        bump_menu_version()
         self.browser = webdriver.Firefox()
 
     def tearDown(self):
@@ -44,6 +50,12 @@ class DeliveryFirefoxTests(LoginBrowserUserMixin, StaticLiveServerTestCase):
         form.submit()
         sleep(0.5)
 
+    def wait_for_cart_update(self):
+        """
+        Wait for batched cart clicks to be sent and applied.
+        """
+        sleep(CART_UPDATE_WAIT)
+
     def assert_element_stale(self, element):
         """
         Try to access an element expecting stale state.
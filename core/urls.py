@@ -7,6 +7,7 @@ from . import views
 app_name = 'core'
 urlpatterns = [
     path('', views.index, name='index'),
+    path('metrics/', views.view_metrics, name='metrics'),
     path('<view_name>/', views.InfoView.as_view(), name='info'),
     # TODO development serving
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
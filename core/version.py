@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+from django.utils import timezone
+
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+INFO_VERSION_KEY = 'core:info_version'
+BUILD_VERSION_KEY = 'core:build_version:{digest}'
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def get_version(key):
+    """
+    Return current version stored under key, starting a new one
+    if it's missing from cache, e.g. after a restart.
+    Versions are kept in the default cache, which is shared
+    by worker processes, so a bump in one is seen by all.
+    """
+    version = cache.get(key)
+    if version is None:
+        version = bump_version(key)
+    return version
+
+
+def bump_version(key):
+    """
+    Start a new version, so data stamped with an older one is stale.
+    Versions are nanosecond timestamps of the change that started them.
+    """
+    version = time.time_ns()
+    cache.set(key, version, None)
+    return version
+
+
+def version_datetime(version):
+    return EPOCH + timedelta(microseconds=version // 1000)
+
+
+def datetime_version(value):
+    """
+    Version of data last modified at a datetime.
+    """
+    return (value - EPOCH) // timedelta(microseconds=1) * 1000
+
+
+def get_info_version():
+    return get_version(INFO_VERSION_KEY)
+
+
+def bump_info_version():
+    return bump_version(INFO_VERSION_KEY)
+
+
+def build_files():
+    """
+    Paths of files pages are rendered with besides data: templates
+    and the manifest of hashed static file names, if collected.
+    """
+    template_dirs = list(get_app_template_dirs('templates'))
+    for engine in engines.all():
+        template_dirs.extend(getattr(engine, 'dirs', []))
+    for template_dir in sorted(set(template_dirs)):
+        for root, dirs, files in os.walk(template_dir):
+            dirs.sort()
+            for name in sorted(files):
+                yield os.path.join(root, name)
+    manifest = getattr(staticfiles_storage, 'manifest_name', None)
+    if manifest and staticfiles_storage.exists(manifest):
+        yield staticfiles_storage.path(manifest)
+
+
+def compute_build_digest():
+    digest = hashlib.md5()
+    for path in build_files():
+        with open(path, 'rb') as build_file:
+            digest.update(path.encode() + b'\0' + build_file.read())
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def cached_build_digest():
+    return compute_build_digest()
+
+
+def get_build_digest():
+    """
+    Return digest of templates and static files manifest, which
+    changes with a deploy, so do pages and fragments rendered from
+    them. Computed once per process unless templates may be edited
+    while it runs, in DEBUG.
+    """
+    if settings.DEBUG:
+        return compute_build_digest()
+    return cached_build_digest()
+
+
+def get_build_version():
+    """
+    Return version of the running build, started by the first process
+    running it, so pages cached by clients before a deploy are stale.
+    """
+    return get_version(BUILD_VERSION_KEY.format(digest=get_build_digest()))
@@ -1,7 +1,13 @@
 from django.shortcuts import render, get_object_or_404
 from django.views import generic
+from django.http import JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.utils.decorators import method_decorator
 
 from .models import InfoViewTemplate
+from .metrics import get_view_metrics
+from .conditional import versioned_page
+from .version import get_info_version, get_build_version
 
 
 def index(request):
@@ -12,6 +18,11 @@ def index(request):
     return render(request, template_name)
 
 
+def info_page_versions(request, *args, **kwargs):
+    return [get_info_version(), get_build_version()]
+
+
+@method_decorator(versioned_page(info_page_versions), name='dispatch')
 class InfoView(generic.DetailView):
     template_name = 'core/info.html'
     model = InfoViewTemplate
@@ -19,3 +30,11 @@ class InfoView(generic.DetailView):
     def get_object(self):
         view_name = self.kwargs['view_name']
         return get_object_or_404(InfoViewTemplate, view_name=view_name)
+
+
+@staff_member_required
+def view_metrics(request):
+    """
+    Aggregated costs of views recorded by ViewMetricsMiddleware.
+    """
+    return JsonResponse(get_view_metrics())
@@ -0,0 +1,20 @@
+"""
+ASGI config for delivery project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``, routed by delivery.routing. Serve it with
+e.g. `daphne delivery.asgi:application`.
+
+For more information on this file, see
+https://channels.readthedocs.io/en/2.x/deploying.html
+"""
+
+import os
+
+import django
+from channels.routing import get_default_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'delivery.settings')
+
+django.setup()
+application = get_default_application()
@@ -0,0 +1,24 @@
+"""
+ASGI routing of delivery project, served through delivery.asgi.
+
+Cart endpoints are answered by async consumers of menu.consumers,
+every other request by Django's views, in a worker thread each.
+"""
+from django.urls import path, re_path
+
+from channels.http import AsgiHandler
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.sessions import SessionMiddlewareStack
+
+from menu.consumers import UpdateCartConsumer, UpdateCartBatchConsumer
+
+application = ProtocolTypeRouter({
+    'http': URLRouter([
+        # paths of menu:update_cart and menu:update_cart_batch
+        path('menu/update_cart/',
+             SessionMiddlewareStack(UpdateCartConsumer)),
+        path('menu/update_cart_batch/',
+             SessionMiddlewareStack(UpdateCartBatchConsumer)),
+        re_path(r'', AsgiHandler),
+    ]),
+})
@@ -45,6 +45,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ViewMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -74,6 +75,48 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'delivery.wsgi.application'
 
+# ASGI application of channels, served through delivery.asgi, answers
+# cart clicks with async consumers. Compare both with bench_cart_clicks.
+ASGI_APPLICATION = 'delivery.routing.application'
+
+# Per-view query count, SQL, template and session time are logged
+# to 'core.metrics' logger and aggregated at core:metrics for admins.
+# ViewMetricsMiddleware is removed from the chain when disabled.
+VIEW_METRICS_ENABLED = False
+
+
+# Logging
+# https://docs.djangoproject.com/en/2.1/topics/logging/
+# Django's default logging drops INFO records of project loggers,
+# so metrics lines are written as they are, one JSON object per line,
+# to stderr, where the process manager collects them.
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'metrics': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'core.metrics': {
+            'handlers': ['metrics'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Navbar views are shared between processes in this cache, so a change
+# saved by one is seen by all. With None they're cached in process memory
+# and rebuilt whenever the info version changes.
+NAVBAR_CACHE_ALIAS = 'default'
+
 
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
@@ -86,6 +129,54 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+# Caches hold menu and info versions, cart snapshots and sessions,
+# which every worker process has to see the same, so they're shared
+# in memcached at DELIVERY_MEMCACHED_LOCATION (python-memcached client).
+# Set it to an empty string to keep caches in the database instead,
+# whose table is created with `manage.py createcachetable`.
+
+MEMCACHED_LOCATION = os.environ.get(
+    'DELIVERY_MEMCACHED_LOCATION', '127.0.0.1:11211')
+
+if MEMCACHED_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': MEMCACHED_LOCATION,
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': MEMCACHED_LOCATION,
+            'KEY_PREFIX': 'sessions',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'delivery_cache',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        },
+    }
+
+
+# Sessions
+# https://docs.djangoproject.com/en/2.1/topics/http/sessions/
+# Cart updates read the session on every click, cached_db serves those
+# reads from the sessions cache and keeps sessions in database for
+# persistence. With caches in the database a cache would only add
+# a query, so sessions are read from their table directly.
+# Compare engines with `manage.py bench_sessions`.
+
+if 'sessions' in CACHES:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    SESSION_CACHE_ALIAS = 'sessions'
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -128,6 +219,44 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.1/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# collectstatic concatenates and minifies bundles, gives collected files
+# content-hashed names and writes gzip (and, with the brotli package
+# installed, brotli) siblings, so STATIC_ROOT can be served with
+# year-long cache headers. Templates link bundles with {% bundle %}.
+STATICFILES_STORAGE = 'core.assets.AssetsStorage'
+
+STATIC_BUNDLES = {
+    'bundles/base.css': ['core/style.css'],
+    'bundles/menu_list.css': ['core/style.css', 'menu/menu_list_style.css'],
+    'bundles/menu_detail.css': [
+        'core/style.css', 'menu/menu_detail_style.css'],
+    'bundles/specials.css': ['core/style.css', 'menu/specials_style.css'],
+    'bundles/shopping_cart.css': [
+        'core/style.css', 'orders/shopping_cart_style.css'],
+    'bundles/cart_state.js': ['menu/cart_state.js'],
+    'bundles/menu_list.js': [
+        'menu/menu_script.js', 'menu/cart_state.js',
+        'menu/menu_list_script.js'],
+    'bundles/menu_detail.js': ['menu/menu_script.js', 'menu/cart_state.js'],
+    'bundles/shopping_cart.js': [
+        'menu/menu_script.js', 'orders/orders_script.js'],
+    'bundles/order_status.js': ['orders/order_status.js'],
+}
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+
+# keeps files saved while testing out of MEDIA_ROOT
+TEST_RUNNER = 'core.test_runner.TempMediaTestRunner'
+
+# Derivatives of uploaded menu images are generated by a worker thread
+# of the process that saved them, or right away when this is False.
+# Generate missing ones with `manage.py generate_image_derivatives`.
+IMAGE_DERIVATIVES_ASYNC = True
+
+# Order status changes are pushed to status streams of this process,
+# streams held by other processes pick them up on their next heartbeat,
+# see orders.views. A broker shared by processes pushes them right away.
+ORDER_EVENTS_BROKER = 'orders.events.LocalBroker'
@@ -0,0 +1,24 @@
+"""
+Settings the test suite is run with:
+
+    python manage.py test --settings=delivery.test_settings
+
+Caches are kept in local memory, so tests need no memcached server,
+under the same aliases as in delivery.settings, so sessions are
+served by cached_db as they are deployed.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'delivery-default',
+        # room for cached menu fragments, one per item
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'delivery-sessions',
+    },
+}
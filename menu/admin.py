@@ -1,10 +1,14 @@
 from django.contrib import admin
+from django.utils import timezone
 
 from .models import MenuItem, MenuSpecial
+from .version import bump_menu_version
 
 
 class MenuItemAdmin(admin.ModelAdmin):
     list_display = ('available', '__str__', 'price')
+    # used by autocomplete of order contents
+    search_fields = ('name',)
 
     actions = ['make_available', 'make_unavailable']
 
@@ -22,7 +26,10 @@ class MenuItemAdmin(admin.ModelAdmin):
     make_unavailable.short_description = "Hide selected items from customers"
 
     def _change_availability(self, request, queryset, available, message):
-        rows_updated = queryset.update(available=available)
+        rows_updated = queryset.update(
+            available=available, last_modified=timezone.now())
+        # update() doesn't send save signals
+        bump_menu_version()
         if rows_updated == 1:
             message_bit = "1 item was"
         else:
@@ -0,0 +1,77 @@
+from .models import MenuItem, MenuSpecial
+from orders.queue import MAX_ID
+
+API_PAGE_SIZE = 50
+MAX_API_PAGE_SIZE = 200
+
+# fields clients can select, all of them by default
+API_FIELDS = {
+    MenuItem: ('id', 'name', 'price', 'image', 'available', 'last_modified'),
+    MenuSpecial: ('id', 'name', 'image', 'available', 'last_modified'),
+}
+AVAILABLE_FILTERS = {
+    'true': True,
+    'false': False,
+    'all': None,
+}
+
+
+def parse_fields(model, value):
+    """
+    Return fields selected by a comma-separated list, always with id,
+    which pages are keyed by. Raise ValueError on unknown fields.
+    """
+    allowed = API_FIELDS[model]
+    if not value:
+        return list(allowed)
+    fields = value.split(',')
+    if not set(fields) <= set(allowed):
+        raise ValueError(value)
+    return ['id'] + [field for field in dict.fromkeys(fields) if field != 'id']
+
+
+def parse_available(value):
+    try:
+        return AVAILABLE_FILTERS[value]
+    except KeyError:
+        raise ValueError(value)
+
+
+def parse_after(value):
+    """
+    Return id of the last row of the previous page, None on the first.
+    Raise ValueError on malformed ids and ids past the range of
+    database integers, which can't be queried.
+    """
+    if not value:
+        return None
+    after = int(value)
+    if not 0 <= after <= MAX_ID:
+        raise ValueError(value)
+    return after
+
+
+def list_page(model, fields, available=True, after=None,
+              limit=API_PAGE_SIZE):
+    """
+    Return a page of rows of model with selected fields, ordered by id
+    and following the one given, and id of the last row if there are
+    more pages. Rows are fetched with values(), no model instances
+    are built.
+    """
+    rows = model.objects.order_by('pk')
+    if available is not None:
+        rows = rows.filter(available=available)
+    if after is not None:
+        rows = rows.filter(pk__gt=after)
+    rows = list(rows.values(*fields)[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1]['id']
+    if 'image' in fields:
+        storage = model._meta.get_field('image').storage
+        for row in rows:
+            row['image'] = storage.url(row['image'])
+    return rows, next_cursor
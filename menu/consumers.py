@@ -0,0 +1,69 @@
+from django.http import Http404, HttpResponseNotFound, HttpResponseRedirect
+from django.middleware.csrf import CsrfViewMiddleware
+from django.urls import reverse
+
+from channels.db import database_sync_to_async
+from channels.generic.http import AsyncHttpConsumer
+from channels.http import AsgiRequest
+
+from io import BytesIO
+
+from .views import change_cart, change_cart_batch
+
+
+class CartConsumer(AsyncHttpConsumer):
+    """
+    Async path of a cart endpoint, served by the ASGI application.
+    Requests are read, checked and answered on the event loop and only
+    the cart change, which reads the cache and may query the database,
+    takes a worker thread. Sessions are loaded and saved around it by
+    SessionMiddleware of channels, in the store the views use.
+    Requests of other methods are redirected to the menu, as by views.
+    """
+    method = None
+
+    def change(self, request):
+        raise NotImplementedError
+
+    async def handle(self, body):
+        request = AsgiRequest(self.scope, BytesIO(body))
+        request.session = self.scope['session']
+        if request.method != self.method:
+            response = HttpResponseRedirect(reverse('menu:menu'))
+        else:
+            # middleware of views doesn't run here, safe methods pass
+            csrf = CsrfViewMiddleware()
+            csrf.process_request(request)
+            response = csrf.process_view(request, None, (), {})
+        if response is None:
+            try:
+                response = await database_sync_to_async(self.change)(
+                    request)
+            except Http404:
+                response = HttpResponseNotFound()
+        await self.send_response(
+            response.status_code, response.content, headers=[
+                (name.encode('latin-1'), value.encode('latin-1'))
+                for name, value in response.items()])
+
+
+class UpdateCartConsumer(CartConsumer):
+    """
+    Async update_cart.
+    """
+    method = 'GET'
+
+    def change(self, request):
+        return change_cart(
+            request.session, request.GET.get('item_id'),
+            request.GET.get('action', ''))
+
+
+class UpdateCartBatchConsumer(CartConsumer):
+    """
+    Async update_cart_batch.
+    """
+    method = 'POST'
+
+    def change(self, request):
+        return change_cart_batch(request.session, request.body)
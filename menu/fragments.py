@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+import hashlib
+
+from .models import MenuItem
+from .version import get_menu_version
+from core.version import get_build_digest
+
+MENU_LIST_KEY = 'menu:list:{build}:{version}'
+MENU_CARD_KEY = 'menu:card:{id}:{digest}'
+MENU_CARD_TEMPLATE = 'menu/menu_item_card.html'
+# fragments are keyed by their contents, so they only expire to free space
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+
+def card_key(menu_item):
+    """
+    Cache key of a card, which changes with the data it shows,
+    so cards of items untouched by an edit survive a new menu version,
+    and with the build, whose templates and static files it's
+    rendered with.
+    """
+    data = '\0'.join(str(value) for value in (
+        get_build_digest(),
+        menu_item.name, menu_item.price,
+        menu_item.image.name, menu_item.image_digest,
+        menu_item.image_width))
+    digest = hashlib.md5(data.encode()).hexdigest()
+    return MENU_CARD_KEY.format(id=menu_item.id, digest=digest)
+
+
+def render_cards(menu_items):
+    """
+    Return card fragments of menu items, rendering only
+    those missing in cache with a single cache round trip each way.
+    """
+    keys = [card_key(item) for item in menu_items]
+    cards = cache.get_many(keys)
+    missing = {
+        key: render_to_string(MENU_CARD_TEMPLATE, {'menuitem': item})
+        for key, item in zip(keys, menu_items) if key not in cards}
+    if missing:
+        cache.set_many(missing, FRAGMENT_TIMEOUT)
+        cards.update(missing)
+    return [(item.id, cards[key]) for item, key in zip(menu_items, keys)]
+
+
+def get_menu_cards():
+    """
+    Return (id, card fragment) pairs of available menu items.
+    The list is cached under current menu version and build,
+    so it's served without queries until the menu or build changes.
+    """
+    key = MENU_LIST_KEY.format(
+        build=get_build_digest(), version=get_menu_version())
+    cards = cache.get(key)
+    if cards is None:
+        cards = render_cards(list(MenuItem.objects.exclude(available=False)))
+        cache.set(key, cards, FRAGMENT_TIMEOUT)
+    return [(item_id, mark_safe(card)) for item_id, card in cards]
@@ -0,0 +1,163 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.utils import timezone
+
+import hashlib
+import logging
+import queue
+import threading
+from io import BytesIO
+
+from PIL import Image
+
+from .version import bump_menu_version
+
+logger = logging.getLogger(__name__)
+
+# widths of derivatives, 1x and 2x of menu cards and item pages,
+# images are only scaled down to them, see derivative_widths
+DERIVATIVE_WIDTHS = (400, 800, 1200)
+# extension: Pillow format, in order of preference
+DERIVATIVE_FORMATS = (
+    ('webp', 'WEBP'),
+    ('jpg', 'JPEG'),
+)
+DERIVATIVE_QUALITY = 82
+DERIVATIVES_FOLDER = 'derivatives'
+DIGEST_LENGTH = 16
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def derivative_name(digest, width, extension):
+    """
+    Derivatives are named by contents of their source, so they never
+    change under a name and are shared by items with the same image.
+    """
+    return f'{DERIVATIVES_FOLDER}/{digest}/{width}w.{extension}'
+
+
+def derivative_widths(source_width):
+    """
+    Widths of derivatives of an image: the ones narrower than
+    the image and its own width, unless it's wider than all of them,
+    so no derivative is labelled wider than it is.
+    """
+    widths = [width for width in DERIVATIVE_WIDTHS if width < source_width]
+    if source_width <= DERIVATIVE_WIDTHS[-1]:
+        widths.append(source_width)
+    return widths
+
+
+def derivative_urls(image, digest, source_width, extension):
+    """
+    Return (url, width) pairs of derivatives of an image in a format.
+    """
+    return [
+        (image.storage.url(derivative_name(digest, width, extension)), width)
+        for width in derivative_widths(source_width)]
+
+
+def convert(source, image_format):
+    """
+    Return a copy of an image in a mode the format can store.
+    JPEG has no transparency, which is flattened onto white.
+    """
+    if source.mode not in ('RGBA', 'LA') and (
+            'transparency' not in source.info):
+        return source.convert('RGB')
+    source = source.convert('RGBA')
+    if image_format != 'JPEG':
+        return source
+    background = Image.new('RGB', source.size, 'white')
+    background.paste(source, mask=source.getchannel('A'))
+    return background
+
+
+def generate_derivatives(image):
+    """
+    Store derivatives of an image file missing in its storage.
+    Return digest of its contents they are named by and its width.
+    """
+    with image.open('rb') as image_file:
+        data = image_file.read()
+    digest = hashlib.sha256(data).hexdigest()[:DIGEST_LENGTH]
+
+    # only the header is read until a derivative is missing
+    source = Image.open(BytesIO(data))
+    for width in derivative_widths(source.width):
+        for extension, image_format in DERIVATIVE_FORMATS:
+            name = derivative_name(digest, width, extension)
+            if image.storage.exists(name):
+                continue
+            derivative = convert(source, image_format)
+            derivative.thumbnail((width, derivative.height), Image.LANCZOS)
+            output = BytesIO()
+            derivative.save(
+                output, image_format, quality=DERIVATIVE_QUALITY)
+            image.storage.save(name, ContentFile(output.getvalue()))
+    return digest, source.width
+
+
+def process_image(model, pk):
+    """
+    Generate derivatives of an image of a menu item or special
+    and record their digest and the image width, unless the image
+    was replaced meanwhile. Return whether they were recorded.
+    """
+    instance = model.objects.filter(pk=pk).only('image').first()
+    if instance is None or not instance.image:
+        return False
+    digest, width = generate_derivatives(instance.image)
+    # update() skips signals, so derivatives aren't scheduled again
+    return bool(model.objects.filter(
+        pk=pk, image=instance.image.name).update(
+        image_digest=digest, image_width=width,
+        last_modified=timezone.now()))
+
+
+def work():
+    while True:
+        label, pk = _queue.get()
+        close_old_connections()
+        try:
+            if process_image(apps.get_model(label), pk):
+                bump_menu_version()
+        except Exception:
+            logger.exception("Derivatives of %s %s failed.", label, pk)
+        finally:
+            close_old_connections()
+            _queue.task_done()
+
+
+def start_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=work, name='image-derivatives', daemon=True)
+            _worker.start()
+
+
+def submit(model, pk):
+    """
+    Process an image off the request thread, by a worker of this
+    process, or right away unless IMAGE_DERIVATIVES_ASYNC is set.
+    """
+    if not settings.IMAGE_DERIVATIVES_ASYNC:
+        if process_image(model, pk):
+            bump_menu_version()
+        return
+    start_worker()
+    _queue.put((model._meta.label, pk))
+
+
+def wait_for_worker():
+    """
+    Block until all submitted images are processed.
+    """
+    _queue.join()
@@ -0,0 +1,198 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from channels.routing import get_default_application
+
+import asyncio
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import perf_counter
+from urllib.parse import urlencode
+
+from .bench_sessions import SESSION_ENGINES
+from core.benchmark import AsgiClient, benchmark_database, percentile
+from menu.models import MenuItem
+
+PATHS = ('wsgi', 'asgi')
+
+
+class ClickStats(object):
+    """
+    Latencies of cart requests made by concurrent clients.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.latencies = []
+        self.errors = 0
+
+    def record(self, latency, ok):
+        with self.lock:
+            self.latencies.append(latency)
+            self.errors += not ok
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cart click throughput of concurrent customers with the "
+        "same number of worker threads on the WSGI path, where each "
+        "thread serves whole requests, and on the ASGI path, where "
+        "requests are served by an event loop and the threads only run "
+        "the session and cart steps of async consumers. Every click is "
+        "sent as its own update_cart request or clicks are batched like "
+        "menu_script.js does. Latencies include the wait for a worker.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients', type=int, default=20,
+            help="Number of customers clicking at the same time.")
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help="Number of worker threads of either path.")
+        parser.add_argument(
+            '--clicks', type=int, default=50,
+            help="Number of clicks per customer.")
+        parser.add_argument(
+            '--path', action='append', dest='paths', choices=PATHS,
+            help="Path to measure, may be repeated. Defaults to both.")
+        parser.add_argument(
+            '--batch-size', type=int, action='append', dest='batch_sizes',
+            help=("Clicks sent per request, 1 uses update_cart, more use "
+                  "update_cart_batch. May be repeated, defaults to 1 and "
+                  "5."))
+        parser.add_argument(
+            '--engine', choices=list(SESSION_ENGINES), default='cached_db')
+        parser.add_argument(
+            '--json', action='store_true',
+            help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or list(PATHS)
+        batch_sizes = options['batch_sizes'] or [1, 5]
+        if min(batch_sizes) < 1 or options['workers'] < 1:
+            raise CommandError("Batch sizes and workers must be positive.")
+
+        report = []
+        with benchmark_database(), override_settings(
+                SESSION_ENGINE=SESSION_ENGINES[options['engine']]):
+            item_ids = [
+                MenuItem.objects.create(name=f'Dish{i}', price=100).id
+                for i in range(10)]
+            for path in paths:
+                for batch_size in batch_sizes:
+                    report.append(self.measure(
+                        path, item_ids, batch_size, options['clients'],
+                        options['workers'], options['clicks']))
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(
+            f"{options['clients']} clients, {options['workers']} workers, "
+            f"{options['engine']} sessions")
+        for row in report:
+            self.stdout.write(
+                f"{row['path']} batch {row['batch_size']:>3}: "
+                f"{row['clicks_per_second']:9.1f} clicks/s "
+                f"{row['requests_per_second']:9.1f} req/s "
+                f"p50 {row['p50_ms']:7.2f} ms p95 {row['p95_ms']:7.2f} ms "
+                f"{row['errors']} errors")
+
+    def measure(self, path, item_ids, batch_size, clients, workers, clicks):
+        stats = ClickStats()
+        rngs = [random.Random(seed) for seed in range(clients)]
+        start = perf_counter()
+        if path == 'wsgi':
+            self.run_wsgi(rngs, workers, item_ids, batch_size, clicks, stats)
+        else:
+            asyncio.run(self.run_asgi(
+                rngs, workers, item_ids, batch_size, clicks, stats))
+        elapsed = perf_counter() - start
+
+        latencies = sorted(stats.latencies)
+        return {
+            'path': path,
+            'batch_size': batch_size,
+            'clicks_per_second': clients * clicks / elapsed,
+            'requests_per_second': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'errors': stats.errors,
+        }
+
+    def batches(self, rng, item_ids, batch_size, clicks):
+        """
+        Yield url and body of requests with the next clicks,
+        body is None when a click is sent as a query.
+        """
+        for start in range(0, clicks, batch_size):
+            number = min(batch_size, clicks - start)
+            chosen = [rng.choice(item_ids) for i in range(number)]
+            if batch_size == 1:
+                query = urlencode({'item_id': chosen[0], 'action': 'increase'})
+                yield f"{reverse('menu:update_cart')}?{query}", None
+            else:
+                yield reverse('menu:update_cart_batch'), json.dumps({
+                    'operations': [
+                        {'item_id': item_id, 'action': 'increase'}
+                        for item_id in chosen]})
+
+    def run_wsgi(self, rngs, workers, item_ids, batch_size, clicks, stats):
+        # customers queue their requests for the workers, like a server's
+        # connections do, so latencies include the wait on both paths
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            with ThreadPoolExecutor(max_workers=len(rngs)) as customers:
+                list(customers.map(
+                    lambda rng: self.click_wsgi(
+                        executor, Client(), rng, item_ids, batch_size,
+                        clicks, stats),
+                    rngs))
+
+    def click_wsgi(self, executor, client, rng, item_ids, batch_size, clicks,
+                   stats):
+        # a customer's clicks are sequential, as they share a session
+        for url, body in self.batches(rng, item_ids, batch_size, clicks):
+            request_start = perf_counter()
+            if body is None:
+                response = executor.submit(client.get, url).result()
+            else:
+                response = executor.submit(
+                    client.post, url, body,
+                    content_type='application/json').result()
+            stats.record(
+                perf_counter() - request_start, response.status_code == 200)
+
+    async def run_asgi(self, rngs, workers, item_ids, batch_size, clicks,
+                       stats):
+        # sync steps of consumers and views run on the default executor
+        executor = ThreadPoolExecutor(max_workers=workers)
+        asyncio.get_event_loop().set_default_executor(executor)
+        application = get_default_application()
+        await asyncio.gather(*(
+            self.click_asgi(
+                AsgiClient(application), rng, item_ids, batch_size, clicks,
+                stats)
+            for rng in rngs))
+        executor.shutdown()
+
+    async def click_asgi(self, client, rng, item_ids, batch_size, clicks,
+                         stats):
+        headers = [(b'content-type', b'application/json')]
+        if batch_size > 1:
+            # consumers check CSRF tokens, unlike the test client
+            status, response_headers, body = await client.request(
+                'GET', reverse('menu:cart_state'))
+            csrf_token = json.loads(body)['csrf_token']
+            headers.append((b'x-csrftoken', csrf_token.encode()))
+        for url, body in self.batches(rng, item_ids, batch_size, clicks):
+            request_start = perf_counter()
+            if body is None:
+                status, response_headers, response_body = (
+                    await client.request('GET', url))
+            else:
+                status, response_headers, response_body = (
+                    await client.request('POST', url, body.encode(), headers))
+            stats.record(perf_counter() - request_start, status == 200)
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+import tempfile
+
+from core.benchmark import benchmark_database, measure_rate
+from menu.models import MenuItem
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'file': 'django.contrib.sessions.backends.file',
+}
+
+
+class Command(BaseCommand):
+    help = "Compare update_cart clicks per second across session engines."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clicks', type=int, default=500,
+            help="Number of clicks measured per engine.")
+        parser.add_argument(
+            '--engine', action='append', dest='engines',
+            choices=list(SESSION_ENGINES),
+            help="Engine to measure, may be repeated. Defaults to all.")
+
+    def handle(self, *args, **options):
+        engines = options['engines'] or list(SESSION_ENGINES)
+        with benchmark_database(), tempfile.TemporaryDirectory() as tmp_dir:
+            menu_item = MenuItem.objects.create(name='Dish', price=100)
+            for engine in engines:
+                with override_settings(
+                        SESSION_ENGINE=SESSION_ENGINES[engine],
+                        SESSION_FILE_PATH=tmp_dir):
+                    rate = self.clicks_per_second(
+                        menu_item.id, options['clicks'])
+                self.stdout.write(f'{engine:<10} {rate:10.1f} clicks/s')
+
+    def clicks_per_second(self, item_id, clicks):
+        client = Client()
+        url = reverse('menu:update_cart')
+        query = {'item_id': item_id, 'action': 'increase'}
+        # the first click creates a session
+        client.get(url, query)
+        return measure_rate(lambda: client.get(url, query), clicks)
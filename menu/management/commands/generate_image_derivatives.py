@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from menu.images import process_image
+from menu.models import MenuItem, MenuSpecial
+from menu.version import bump_menu_version
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate missing derivatives of menu item and special images, "
+        "e.g. of images uploaded before they were introduced.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Process images that already have derivatives too.")
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        for model in (MenuItem, MenuSpecial):
+            queryset = model.objects.order_by('pk')
+            if not options['all']:
+                # widths weren't recorded by earlier versions
+                queryset = queryset.filter(
+                    Q(image_digest='') | Q(image_width__isnull=True))
+            for pk in queryset.values_list('pk', flat=True):
+                try:
+                    processed += process_image(model, pk)
+                except (OSError, ValueError) as error:
+                    failed += 1
+                    self.stderr.write(
+                        f"{model._meta.label} {pk}: {error}")
+        if processed:
+            bump_menu_version()
+        self.stdout.write(
+            f"Processed {processed} images, {failed} failed.")
@@ -12,7 +12,12 @@ class MenuItem(models.Model):
     image = models.ImageField(
         upload_to='menu_items/',
         default=DEFAULT_ITEM_IMG)
+    # names derivatives of the image, empty until they are generated
+    image_digest = models.CharField(max_length=16, blank=True, editable=False)
+    # derivatives are no wider than the image
+    image_width = models.PositiveIntegerField(null=True, editable=False)
     available = models.BooleanField(default=True)
+    last_modified = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -26,4 +31,7 @@ class MenuSpecial(models.Model):
     image = models.ImageField(
         upload_to='menu_specials/',
         default=DEFAULT_SPECIAL_IMG)
+    image_digest = models.CharField(max_length=16, blank=True, editable=False)
+    image_width = models.PositiveIntegerField(null=True, editable=False)
     available = models.BooleanField(default=True)
+    last_modified = models.DateTimeField(auto_now=True)
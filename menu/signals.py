@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import MenuItem, MenuSpecial
+from .version import bump_menu_version
+from .images import submit
+
+
+@receiver([post_save, post_delete], sender=MenuItem)
+@receiver([post_save, post_delete], sender=MenuSpecial)
+def menu_changed(sender, **kwargs):
+    bump_menu_version()
+
+
+@receiver(pre_save, sender=MenuItem)
+@receiver(pre_save, sender=MenuSpecial)
+def image_replaced(sender, instance, raw=False, **kwargs):
+    """
+    Derivatives of a replaced image are left behind.
+    """
+    if raw or not instance.image_digest:
+        return
+    stored_image = sender.objects.filter(
+        pk=instance.pk).values_list('image', flat=True).first()
+    if stored_image != instance.image.name:
+        instance.image_digest = ''
+        instance.image_width = None
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_save, sender=MenuSpecial)
+def schedule_derivatives(sender, instance, raw=False, **kwargs):
+    """
+    Images without derivatives are processed once they are committed.
+    """
+    if raw or instance.image_digest:
+        return
+    transaction.on_commit(lambda: submit(sender, instance.pk))
@@ -0,0 +1,28 @@
+// per-session cart data is fetched, so pages themselves can be cached,
+// cart updates are ignored until it's loaded, 'cartstateloaded' is
+// dispatched on document once amounts are filled in
+let csrf_token = null
+
+document.addEventListener("DOMContentLoaded", function() {
+  // cart_state_url set on Django template
+  let stateRequest = new Request(cart_state_url, {
+    credentials: 'same-origin',
+  })
+
+  fetch(stateRequest).then(function(response) {
+    if (response.ok) {
+      return response.json()
+    }
+    throw new Error('Cart could not be loaded.');
+  }).then(function(responseJson) {
+    document.getElementById('cart-cost').textContent = responseJson.cart_cost
+    for (let current_amount of document.getElementsByClassName('current-amount')) {
+      current_amount.textContent = responseJson.amounts[current_amount.dataset.item_id] || 0
+    }
+    csrf_token = responseJson.csrf_token
+    // let page scripts react to the amounts
+    document.dispatchEvent(new Event('cartstateloaded'))
+  }).catch(function(error) {
+    console.log('There has been a problem with your fetch operation: ', error.message);
+  });
+});
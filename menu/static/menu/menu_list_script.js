@@ -1,5 +1,5 @@
-// menu list has covering element
-document.addEventListener("DOMContentLoaded", function() {
+// menu list has covering element, amounts are filled in by cart_state
+document.addEventListener("cartstateloaded", function() {
   for (let current_amount of document.getElementsByClassName('current-amount')) {
     updateVisible(current_amount);
   };
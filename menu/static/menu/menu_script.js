@@ -9,7 +9,18 @@ document.addEventListener("DOMContentLoaded", function() {
   };
 });
 
+// clicks made within this delay (ms) are sent in a single request
+const BATCH_DELAY = 300
+
+// amounts waiting to be sent, keyed by item id
+let pending_updates = {}
+let batch_timer = null
+
 function updateCart(e) {
+  // csrf_token is set once the cart is loaded on cacheable pages
+  if (csrf_token === null) {
+    return
+  }
 
   let menu_item = e.currentTarget.closest('.menu-item')
   let current_amount = menu_item.getElementsByClassName('current-amount')[0]
@@ -27,12 +38,39 @@ function updateCart(e) {
     }
   }
   current_amount.textContent = new_amount
-  item_id = current_amount.dataset.item_id
+  let item_id = current_amount.dataset.item_id
 
-  query = {'item_id': item_id,'action': action}
-  // update_cart_url set on Django template
-  final_url = update_cart_url + '?' + encodeQueryData(query)
-  let updateRequest = new Request(final_url)
+  if (!(item_id in pending_updates)) {
+    pending_updates[item_id] = {
+      'confirmed_amount': last_amount_num,
+      'menu_item': menu_item,
+      'current_amount': current_amount,
+    }
+  }
+  pending_updates[item_id]['amount'] = new_amount
+
+  clearTimeout(batch_timer)
+  batch_timer = setTimeout(sendUpdates, BATCH_DELAY)
+};
+
+function sendUpdates() {
+  let updates = pending_updates
+  pending_updates = {}
+
+  let operations = []
+  for (let item_id in updates) {
+    operations.push({'item_id': item_id, 'amount': updates[item_id]['amount']})
+  }
+  // update_cart_batch_url and csrf_token set on Django template
+  let updateRequest = new Request(update_cart_batch_url, {
+    method: 'POST',
+    credentials: 'same-origin',
+    headers: {
+      'Content-Type': 'application/json',
+      'X-CSRFToken': csrf_token,
+    },
+    body: JSON.stringify({'operations': operations}),
+  })
 
   fetch(updateRequest).then(function(response) {
     if (response.ok) {
@@ -40,16 +78,27 @@ function updateCart(e) {
     }
     throw new Error('Incorrect amount or action.');
   }).then(function(responseJson) {
-    let elements = {
-      'cart_cost': document.getElementById('cart-cost'),
-      'menu_item': menu_item,
-      'current_amount': current_amount,
+    for (let item_id in updates) {
+      let update = updates[item_id]
+      // newer clicks on the item are still waiting to be sent
+      if (!(item_id in pending_updates)) {
+        update['current_amount'].textContent = responseJson.amounts[item_id]
+      }
+      let elements = {
+        'cart_cost': document.getElementById('cart-cost'),
+        'menu_item': update['menu_item'],
+        'current_amount': update['current_amount'],
+      }
+      parseResult(responseJson, elements)
     }
-    parseResult(responseJson, elements)
   }).catch(function(error) {
-    // set amount to previous and show an error
-    current_amount.textContent = last_amount_num
-    showError(error, menu_item);
+    // set amounts to previous and show an error
+    let container
+    for (let item_id in updates) {
+      updates[item_id]['current_amount'].textContent = updates[item_id]['confirmed_amount']
+      container = updates[item_id]['menu_item']
+    }
+    showError(error, container);
   });
 };
 
@@ -57,14 +106,6 @@ function parseResult(resp, elements) {
     elements['cart_cost'].textContent = resp.new_cost
 };
 
-function encodeQueryData(data) {
-  // https://stackoverflow.com/a/111545
-  const ret = [];
-  for (let d in data)
-    ret.push(encodeURIComponent(d) + '=' + encodeURIComponent(data[d]));
-  return ret.join('&');
-};
-
 function showError(error, container) {
   console.log('There has been a problem with your fetch operation: ', error.message);
 
@@ -0,0 +1,30 @@
+from django import template
+
+from ..images import derivative_urls
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_srcset(image, digest, source_width, extension):
+    """
+    srcset of derivatives of an image in a format.
+    """
+    return ', '.join(
+        f'{url} {width}w' for url, width in derivative_urls(
+            image, digest, source_width, extension))
+
+
+@register.inclusion_tag('menu/picture.html')
+def menu_picture(obj, sizes):
+    """
+    Picture of a menu item or special, choosing among its derivatives,
+    or the uploaded image until they are generated.
+    """
+    return {
+        'image': obj.image,
+        'digest': obj.image_digest,
+        'width': obj.image_width,
+        'alt': obj.name,
+        'sizes': sizes,
+    }
@@ -1,10 +1,33 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.urls import reverse
 
+import json
+import shutil
+import tempfile
+from io import BytesIO, StringIO
 from random import randint
+from unittest import mock
+from urllib.parse import urlencode
 
-from .models import MenuItem
-from accounts.tests import AccountsTestConstants
+from asgiref.sync import async_to_sync
+from PIL import Image
+
+from .models import MenuItem, MenuSpecial
+from .version import get_menu_version, bump_menu_version
+from . import fragments
+from .images import (
+    process_image, submit, wait_for_worker, derivative_name,
+    derivative_widths, DERIVATIVE_WIDTHS)
+from accounts.tests import AccountsTestConstants, USER_MODEL
+from orders.models import MAX_ORDER_VOLUME
+from core.benchmark import AsgiClient
+from core.models import InfoViewTemplate
+from delivery.routing import application
 
 
 class MenuTestConstants(object):
@@ -14,6 +37,11 @@ class MenuTestConstants(object):
         'price': 100
     }
 
+    def setUp(self):
+        super().setUp()
+        # cached menu fragments outlive rolled back test data
+        bump_menu_version()
+
     def get_list_of_menu_items(self, number):
         items_list = []
         for i in range(number):
@@ -83,6 +111,35 @@ class MenuItemModelTests(CustomTestCase):
             self.assertEqual(value, db_value)
 
 
+class MenuVersionTests(CustomTestCase):
+
+    def test_version_bumped_on_change(self):
+        """
+        Saving or deleting a menu item starts a new menu version.
+        """
+        version = get_menu_version()
+        menu_item = MenuItem.objects.create(**self.DEF_DISH)
+        self.assertNotEqual(version, get_menu_version())
+
+        version = get_menu_version()
+        menu_item.delete()
+        self.assertNotEqual(version, get_menu_version())
+
+    def test_version_bumped_by_admin_actions(self):
+        """
+        Availability admin actions start a new menu version.
+        """
+        item_id = self.add_menu_item()
+        self.client.force_login(USER_MODEL.objects.create_superuser(
+            **self.user_for_create_user))
+        for action in ('make_unavailable', 'make_available'):
+            version = get_menu_version()
+            self.client.post(
+                reverse('admin:menu_menuitem_changelist'),
+                {'action': action, '_selected_action': [item_id]})
+            self.assertNotEqual(version, get_menu_version())
+
+
 # Views tests
 class MenuListViewTests(CustomTestCase):
 
@@ -129,6 +186,240 @@ class MenuListViewTests(CustomTestCase):
         self.assertNotIn(unavailable, response.context['object_list'])
 
 
+class MenuListCacheTests(CustomTestCase):
+
+    URL = reverse('menu:menu')
+
+    def test_list_served_from_cache(self):
+        """
+        Once rendered, the list is served without menu queries.
+        """
+        self.get_list_of_menu_items(3)
+        self.client.get(self.URL)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.URL)
+        self.assertFalse([query for query in context.captured_queries
+                          if 'menu_menuitem' in query['sql']])
+        for i in range(3):
+            self.assertContains(response, f'Dish{i}')
+
+    def test_cart_amounts_fetched_separately(self):
+        """
+        Cached pages get amounts in the cart of each visitor
+        from cart_state.
+        """
+        item_id = self.add_menu_item()
+        self.client.get(self.URL)
+        self.change_item_amount_in_cart(item_id=item_id, amount=3)
+        response = self.client.get(reverse('menu:cart_state'))
+        self.assertEqual(response.json()['amounts'], {str(item_id): 3})
+        self.assertEqual(response.json()['cart_cost'], 300)
+        self.assertTrue(response.json()['csrf_token'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_list_refreshed_on_menu_change(self):
+        """
+        Edits, admin actions and specials start a new list.
+        """
+        menu_item = MenuItem.objects.create(**self.DEF_DISH)
+        self.client.get(self.URL)
+
+        menu_item.name = 'Renamed Dish'
+        menu_item.save()
+        self.assertContains(self.client.get(self.URL), 'Renamed Dish')
+
+        self.client.force_login(USER_MODEL.objects.create_superuser(
+            **self.user_for_create_user))
+        self.client.post(
+            reverse('admin:menu_menuitem_changelist'),
+            {'action': 'make_unavailable', '_selected_action': [menu_item.id]})
+        self.assertNotContains(self.client.get(self.URL), 'Renamed Dish')
+
+        version = get_menu_version()
+        MenuSpecial.objects.create(name='Special')
+        self.assertNotEqual(version, get_menu_version())
+
+    def test_unchanged_cards_reused(self):
+        """
+        A new menu version only renders cards of edited items.
+        """
+        menu_items = self.get_list_of_menu_items(3)
+        fragments.get_menu_cards()
+        menu_items[0].price += 1
+        menu_items[0].save()
+        with mock.patch.object(
+                fragments, 'render_to_string',
+                wraps=fragments.render_to_string) as render:
+            fragments.get_menu_cards()
+        self.assertEqual(render.call_count, 1)
+
+    def test_cards_rendered_again_after_deploy(self):
+        """
+        Cards cached by a previous build, whose static and url output
+        may be gone, are rendered again with the new one.
+        """
+        self.get_list_of_menu_items(3)
+        fragments.get_menu_cards()
+        renders = mock.patch.object(
+            fragments, 'render_to_string', wraps=fragments.render_to_string)
+        with mock.patch.object(
+                fragments, 'get_build_digest', return_value='new build'):
+            with renders as render:
+                fragments.get_menu_cards()
+        self.assertEqual(render.call_count, 3)
+
+
+class ConditionalGetTests(CustomTestCase):
+
+    def assert_not_modified(self, url, expected=True):
+        """
+        A request validated with an earlier response gets 304
+        or, unless expected, the full page.
+        """
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 304 if expected else 200)
+
+    def get_validated(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.etag = response['ETag']
+        return response
+
+    def test_menu_pages_not_modified(self):
+        """
+        Menu and specials are validated by menu version.
+        """
+        menu_item = MenuItem.objects.create(**self.DEF_DISH)
+        for url in (reverse('menu:menu'), reverse('menu:specials')):
+            response = self.get_validated(url)
+            self.assertTrue(response.has_header('Last-Modified'))
+            self.assertNotIn('Cookie', response.get('Vary', ''))
+            self.assert_not_modified(url)
+
+            menu_item.price += 1
+            menu_item.save()
+            self.assert_not_modified(url, expected=False)
+
+    def test_menu_pages_changed_by_info_views(self):
+        """
+        Navbar of every page lists info views.
+        """
+        url = reverse('menu:menu')
+        self.get_validated(url)
+        InfoViewTemplate.objects.create(view_name='about')
+        self.assert_not_modified(url, expected=False)
+
+    def test_item_page_not_modified(self):
+        """
+        Item pages are validated by their item only.
+        """
+        menu_item, other_item = self.get_list_of_menu_items(2)
+        url = reverse('menu:detail', args=(menu_item.id,))
+        response = self.get_validated(url)
+        self.assertContains(response, menu_item.name)
+        other_item.save()
+        self.assert_not_modified(url)
+
+        menu_item.save()
+        self.assert_not_modified(url, expected=False)
+
+    def test_hidden_item_page_modified(self):
+        """
+        Admin availability actions change item pages.
+        """
+        item_id = self.add_menu_item()
+        url = reverse('menu:detail', args=(item_id,))
+        self.get_validated(url)
+        self.client.force_login(USER_MODEL.objects.create_superuser(
+            **self.user_for_create_user))
+        self.client.post(
+            reverse('admin:menu_menuitem_changelist'),
+            {'action': 'make_unavailable', '_selected_action': [item_id]})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 404)
+
+    def test_if_modified_since(self):
+        url = reverse('menu:menu')
+        response = self.get_validated(url)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+
+class MenuApiTests(CustomTestCase):
+
+    ITEMS_URL = reverse('menu:api_items')
+
+    def walk_pages(self, url, params):
+        rows, pages = [], 0
+        params = dict(params)
+        while True:
+            data = self.client.get(url, params).json()
+            rows += data['results']
+            pages += 1
+            if data['next'] is None:
+                return rows, pages
+            params['after'] = data['next']
+
+    def test_pages_walk_available_items(self):
+        """
+        Keyset pages list every available item once, by id.
+        """
+        menu_items = self.get_list_of_menu_items(5)
+        MenuItem.objects.filter(pk=menu_items[2].pk).update(available=False)
+        rows, pages = self.walk_pages(self.ITEMS_URL, {'limit': 2})
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [item.id for item in menu_items if item != menu_items[2]])
+        self.assertEqual(pages, 2)
+        self.assertEqual(rows[0]['price'], menu_items[0].price)
+        self.assertEqual(rows[0]['image'], menu_items[0].image.url)
+
+        rows, pages = self.walk_pages(self.ITEMS_URL, {'available': 'false'})
+        self.assertEqual([row['id'] for row in rows], [menu_items[2].id])
+        rows, pages = self.walk_pages(self.ITEMS_URL, {'available': 'all'})
+        self.assertEqual(len(rows), 5)
+
+    def test_sparse_fields(self):
+        """
+        Only selected fields and id are returned.
+        """
+        self.add_menu_item()
+        response = self.client.get(self.ITEMS_URL, {'fields': 'name,price'})
+        self.assertEqual(
+            set(response.json()['results'][0]), {'id', 'name', 'price'})
+
+    def test_page_is_a_single_query(self):
+        self.get_list_of_menu_items(5)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.ITEMS_URL, {'limit': 2, 'after': 1})
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_version_token(self):
+        """
+        Version follows the menu and validates conditional requests.
+        """
+        self.add_menu_item()
+        response = self.client.get(self.ITEMS_URL)
+        self.assertEqual(response.json()['version'], str(get_menu_version()))
+        response = self.client.get(
+            self.ITEMS_URL, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_specials(self):
+        special = MenuSpecial.objects.create(name='Special')
+        response = self.client.get(reverse('menu:api_specials'))
+        self.assertEqual(response.json()['results'][0]['name'], special.name)
+        self.assertNotIn('price', response.json()['results'][0])
+
+    def test_malformed_parameters(self):
+        for params in ({'fields': 'name,secret'}, {'available': 'maybe'},
+                       {'after': 'x'}, {'after': 10 ** 30}, {'after': -1},
+                       {'limit': 0}, {'limit': 1000}):
+            response = self.client.get(self.ITEMS_URL, params)
+            self.assertEqual(response.status_code, 400)
+
+
 class MenuDetailViewTests(CustomTestCase):
     def test_unavailable_items_raise_404(self):
         """
@@ -178,6 +469,51 @@ class MenuItemUpdateCartTests(CustomTestCase):
         self.assertEqual(response.status_code, 400)
         self.assert_session_key('cart', {})
 
+    def test_increase_above_limit(self):
+        """
+        An item can't be added more times than an order line holds.
+        """
+        item_id = self.add_menu_item()
+        query = {'item_id': item_id, 'action': 'increase'}
+        for i in range(MAX_ORDER_VOLUME):
+            self.client.get(self.URL, query)
+
+        response = self.client.get(self.URL, query)
+        self.assertEqual(response.status_code, 400)
+        self.assert_session_key('cart', {str(item_id): MAX_ORDER_VOLUME})
+
+    def test_non_canonical_item_id(self):
+        """
+        Ids with leading zeros update the item's own cart entry.
+        """
+        item_id = self.add_menu_item()
+        response = self.client.get(
+            self.URL, {'item_id': f'0{item_id}', 'action': 'increase'})
+        self.assertEqual(response.status_code, 200)
+        self.assert_session_key('cart', {str(item_id): 1})
+
+    def test_malformed_item_id(self):
+        """
+        Missing, malformed and out of range ids return bad request.
+        """
+        for query in ({}, {'item_id': ''}, {'item_id': 'abc'},
+                      {'item_id': 0}, {'item_id': 10 ** 30}):
+            response = self.client.get(
+                self.URL, {**query, 'action': 'increase'})
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.client.session.get('cart'))
+
+    def test_unknown_item(self):
+        """
+        Missing or hidden items return not found, like on batches.
+        """
+        item = MenuItem.objects.create(available=False, **self.DEF_DISH)
+        for item_id in (item.id, item.id + 1):
+            response = self.client.get(
+                self.URL, {'item_id': item_id, 'action': 'increase'})
+            self.assertEqual(response.status_code, 404)
+        self.assertFalse(self.client.session.get('cart'))
+
     def test_decrease_below_zero(self):
         """
         Trying to decrease amount of item in cart below zero returns
@@ -318,3 +654,318 @@ class MenuItemUpdateCartTestsLoggedIn(MenuItemUpdateCartTests):
     def setUp(self):
         super().setUp()
         self.login_test_user()
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cache')
+class MenuItemUpdateCartTestsCacheSession(MenuItemUpdateCartTests):
+    """
+    Rerun those tests with sessions kept in cache only.
+    """
+
+
+class UpdateCartBatchTests(CustomTestCase):
+
+    URL = reverse('menu:update_cart_batch')
+
+    def post_operations(self, operations):
+        return self.client.post(
+            self.URL, json.dumps({'operations': operations}),
+            content_type='application/json')
+
+    def test_batch_post_only(self):
+        """
+        Only accept POST requests.
+        """
+        response = self.client.get(self.URL)
+        self.assertRedirects(response, reverse('menu:menu'))
+
+    def test_batch_applied(self):
+        """
+        Actions and amounts of a batch are applied to cart
+        and new amounts and cart cost are returned.
+        """
+        items = self.get_list_of_menu_items(3)
+        self.change_item_amount_in_cart(item_id=items[2].id, amount=2)
+        response = self.post_operations([
+            {'item_id': items[0].id, 'action': 'increase'},
+            {'item_id': items[0].id, 'action': 'increase'},
+            {'item_id': items[1].id, 'amount': 4},
+            {'item_id': items[2].id, 'action': 'remove'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        expected_cart = {str(items[0].id): 2, str(items[1].id): 4}
+        expected_cost = items[0].price * 2 + items[1].price * 4
+        self.assertEqual(response.json(), {
+            'amounts': {**expected_cart, str(items[2].id): 0},
+            'new_cost': expected_cost
+        })
+        self.assert_session_key('cart', expected_cart)
+        self.assert_session_key('cart_cost', expected_cost)
+
+    def test_batch_atomic(self):
+        """
+        A batch with an invalid operation doesn't change cart.
+        """
+        items = self.get_list_of_menu_items(2)
+        amount = self.change_item_amount_in_cart(item_id=items[0].id)
+        invalid_operations = [
+            {'item_id': items[1].id, 'action': 'decrease'},
+            {'item_id': items[1].id, 'action': 'no_such_action'},
+            {'item_id': items[1].id, 'amount': -1},
+            {'item_id': items[1].id, 'amount': '1'},
+            {'item_id': items[1].id, 'amount': MAX_ORDER_VOLUME + 1},
+            {'item_id': items[1].id, 'amount': 10 ** 30},
+            {'item_id': 'not an id', 'amount': 1},
+            {'item_id': 10 ** 30, 'amount': 1},
+            {'item_id': 0, 'amount': 1},
+        ]
+        for invalid in invalid_operations:
+            response = self.post_operations([
+                {'item_id': items[0].id, 'action': 'increase'}, invalid])
+            self.assertEqual(response.status_code, 400)
+            self.assert_session_key('cart', {str(items[0].id): amount})
+            self.assert_session_key('cart_cost', items[0].price * amount)
+
+    def test_batch_malformed(self):
+        """
+        Malformed or empty batches return bad request.
+        """
+        for body in ('not json', '{}', '{"operations": {}}',
+                     '{"operations": [1]}'):
+            response = self.client.post(
+                self.URL, body, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_batch_unknown_item(self):
+        """
+        Operations on missing or hidden items return not found.
+        """
+        item = MenuItem.objects.create(available=False, **self.DEF_DISH)
+        for item_id in (item.id, item.id + 1):
+            response = self.post_operations([
+                {'item_id': item_id, 'action': 'increase'}])
+            self.assertEqual(response.status_code, 404)
+
+
+class AsyncCartTests(MenuTestConstants, TransactionTestCase):
+    """
+    Cart endpoints served by consumers of the ASGI application.
+    Consumers query the database from worker threads, which only
+    see committed data.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # committed items get derivatives of their image otherwise
+        derivatives = mock.patch('menu.signals.submit')
+        derivatives.start()
+        self.addCleanup(derivatives.stop)
+        self.item = MenuItem.objects.create(**self.DEF_DISH)
+        self.asgi_client = AsgiClient(application)
+
+    def asgi_request(self, *args):
+        return async_to_sync(self.asgi_client.request)(*args)
+
+    def click(self, item_id, action='increase'):
+        query = urlencode({'item_id': item_id, 'action': action})
+        return self.asgi_request(
+            'GET', f"{reverse('menu:update_cart')}?{query}")
+
+    def post_operations(self, operations, csrf_token=None):
+        headers = []
+        if csrf_token is not None:
+            headers.append((b'x-csrftoken', csrf_token.encode()))
+        return self.asgi_request(
+            'POST', reverse('menu:update_cart_batch'),
+            json.dumps({'operations': operations}).encode(), headers)
+
+    def test_clicks_shared_with_views(self):
+        """
+        Clicks are kept in the session the views read.
+        """
+        for i in range(2):
+            status, headers, body = self.click(self.item.id)
+            self.assertEqual(status, 200)
+        self.assertEqual(
+            json.loads(body), {'new_cost': self.DEF_DISH['price'] * 2})
+
+        self.client.cookies = self.asgi_client.cookies
+        response = self.client.get(reverse('menu:cart_state'))
+        self.assertEqual(response.json()['amounts'], {str(self.item.id): 2})
+
+    def test_invalid_clicks(self):
+        hidden = MenuItem.objects.create(
+            name='Hidden', price=10, available=False)
+        for item_id, status in ((hidden.id, 404), (10 ** 30, 400),
+                                ('abc', 400)):
+            self.assertEqual(self.click(item_id)[0], status)
+        self.assertEqual(self.click(self.item.id, 'decrease')[0], 400)
+
+    def test_batch_needs_csrf_token(self):
+        """
+        Batches are only applied with the token given by cart_state.
+        """
+        operations = [{'item_id': self.item.id, 'amount': 3}]
+        self.assertEqual(self.post_operations(operations)[0], 403)
+
+        status, headers, body = self.asgi_request(
+            'GET', reverse('menu:cart_state'))
+        csrf_token = json.loads(body)['csrf_token']
+        status, headers, body = self.post_operations(operations, csrf_token)
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {
+            'amounts': {str(self.item.id): 3},
+            'new_cost': self.DEF_DISH['price'] * 3})
+
+    def test_other_methods_redirected(self):
+        for method, url in (('POST', reverse('menu:update_cart')),
+                            ('GET', reverse('menu:update_cart_batch'))):
+            status, headers, body = self.asgi_request(method, url)
+            self.assertEqual(status, 302)
+            self.assertIn(('Location', reverse('menu:menu')), headers)
+
+
+def uploaded_image(width=1000, height=500, color='red', name='dish.png'):
+    output = BytesIO()
+    Image.new('RGB', (width, height), color).save(output, 'PNG')
+    return SimpleUploadedFile(name, output.getvalue(), 'image/png')
+
+
+class MediaRootMixin(object):
+    """
+    Keep uploaded images and their derivatives in a temporary folder.
+    """
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def derivative_files(self):
+        if not default_storage.exists('derivatives'):
+            return []
+        folders, files = default_storage.listdir('derivatives')
+        return [name for folder in folders
+                for name in default_storage.listdir(
+                    f'derivatives/{folder}')[1]]
+
+
+@override_settings(IMAGE_DERIVATIVES_ASYNC=False)
+class ImageDerivativeTests(MediaRootMixin, CustomTestCase):
+
+    def test_derivatives_generated(self):
+        """
+        WebP and JPEG derivatives are stored at every width
+        under a digest of the image contents.
+        """
+        menu_item = MenuItem.objects.create(
+            image=uploaded_image(), **self.DEF_DISH)
+        self.assertTrue(process_image(MenuItem, menu_item.pk))
+        menu_item.refresh_from_db()
+        self.assertTrue(menu_item.image_digest)
+        self.assertEqual(menu_item.image_width, 1000)
+        self.assertEqual(
+            len(self.derivative_files()), len(DERIVATIVE_WIDTHS) * 2)
+
+        name = derivative_name(menu_item.image_digest, 400, 'webp')
+        with default_storage.open(name) as derivative:
+            image = Image.open(derivative)
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (400, 200))
+
+    def test_derivatives_shared_and_not_scaled_up(self):
+        """
+        Same contents reuse derivatives, small images only get
+        a derivative of their own size.
+        """
+        first, second = [
+            MenuItem.objects.create(
+                name=f'Dish{i}', price=10, image=uploaded_image(300, 300))
+            for i in range(2)]
+        process_image(MenuItem, first.pk)
+        files = self.derivative_files()
+        process_image(MenuItem, second.pk)
+        self.assertEqual(self.derivative_files(), files)
+
+        self.assertEqual(len(files), 2)
+
+        first.refresh_from_db()
+        name = derivative_name(first.image_digest, 300, 'jpg')
+        with default_storage.open(name) as derivative:
+            self.assertEqual(Image.open(derivative).size, (300, 300))
+
+    def test_derivative_widths(self):
+        self.assertEqual(derivative_widths(300), [300])
+        self.assertEqual(derivative_widths(1000), [400, 800, 1000])
+        self.assertEqual(derivative_widths(1200), [400, 800, 1200])
+        self.assertEqual(derivative_widths(3000), [400, 800, 1200])
+
+    def test_replaced_image_reprocessed(self):
+        """
+        Replacing an image drops the digest of its derivatives.
+        """
+        menu_item = MenuItem.objects.create(
+            image=uploaded_image(), **self.DEF_DISH)
+        process_image(MenuItem, menu_item.pk)
+        menu_item.refresh_from_db()
+        menu_item.price += 1
+        menu_item.save()
+        self.assertTrue(
+            MenuItem.objects.get(pk=menu_item.pk).image_digest)
+
+        menu_item.image = uploaded_image(color='blue')
+        menu_item.save()
+        self.assertEqual(
+            MenuItem.objects.get(pk=menu_item.pk).image_digest, '')
+
+    def test_srcset_rendered(self):
+        """
+        Pages choose among derivatives once they are generated.
+        """
+        menu_item = MenuItem.objects.create(
+            image=uploaded_image(), **self.DEF_DISH)
+        response = self.client.get(reverse('menu:menu'))
+        self.assertNotContains(response, 'srcset')
+        self.assertContains(response, menu_item.image.url)
+
+        submit(MenuItem, menu_item.pk)
+        digest = MenuItem.objects.get().image_digest
+        for url in (reverse('menu:menu'),
+                    reverse('menu:detail', args=(menu_item.pk,))):
+            response = self.client.get(url)
+            self.assertContains(response, 'type="image/webp"')
+            self.assertContains(response, default_storage.url(
+                derivative_name(digest, 800, 'jpg')) + ' 800w')
+            self.assertContains(response, ' 1000w')
+            self.assertNotContains(response, ' 1200w')
+
+    def test_backfill_command(self):
+        menu_items = [
+            MenuItem.objects.create(
+                name=f'Dish{i}', price=10, image=uploaded_image())
+            for i in range(2)]
+        MenuSpecial.objects.create(name='Special', image=uploaded_image())
+        process_image(MenuItem, menu_items[0].pk)
+
+        out = StringIO()
+        call_command('generate_image_derivatives', stdout=out)
+        self.assertIn('Processed 2 images', out.getvalue())
+        self.assertFalse(MenuItem.objects.filter(image_digest='').exists())
+        self.assertFalse(
+            MenuSpecial.objects.filter(image_digest='').exists())
+
+
+class ImageWorkerTests(MediaRootMixin, TransactionTestCase):
+
+    def test_uploads_processed_by_worker(self):
+        """
+        Saved images are processed off the saving thread once committed.
+        """
+        menu_item = MenuItem.objects.create(
+            name='Dish', price=10, image=uploaded_image())
+        wait_for_worker()
+        self.assertTrue(MenuItem.objects.get(pk=menu_item.pk).image_digest)
+        self.assertTrue(self.derivative_files())
@@ -1,7 +1,6 @@
 from django.urls import reverse
 
 from random import randint
-from time import sleep
 from functools import partial
 from selenium.common.exceptions import ElementClickInterceptedException
 
@@ -160,7 +159,7 @@ class DetailUpdateCartJS(DeliveryFirefoxTests):
 
         for i in range(1, 11):
             self.actions['increase']()
-            sleep(0.1)
+            self.wait_for_cart_update()
             self.assertEqual(
                 int(cart_cost.text), i * MenuItem.objects.get().price)
         self.assert_no_errors()
@@ -220,9 +219,30 @@ class ListUpdateCartJS(MenuTestConstants, DeliveryFirefoxTests):
                     increase_buttons[1].click()
 
             self.assertEqual(current_amount.text, str(rand_clicks))
+            self.wait_for_cart_update()
 
             expected_cart_cost += item.price * rand_clicks
 
             self.assertEqual(
                 expected_cart_cost,
                 int(cart_cost_div.text))
+
+    def test_cart_amounts_shown_after_reload(self):
+        """
+        Items already in cart keep their amount controls on reload.
+        """
+        current_item = self.browser.find_elements_by_class_name(
+            'menu-item')[0]
+        current_item.find_element_by_xpath(
+            ".//div[@data-action='increase']").click()
+        self.wait_for_cart_update()
+
+        self.browser.refresh()
+        self.wait_for_cart_update()
+        current_item = self.browser.find_elements_by_class_name(
+            'menu-item')[0]
+        self.assertEqual(
+            current_item.find_element_by_class_name('current-amount').text,
+            '1')
+        item_amount = current_item.find_element_by_class_name('item-amount')
+        self.assertIn('upper', item_amount.get_attribute('class'))
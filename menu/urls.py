@@ -7,6 +7,11 @@ urlpatterns = [
     path('', views.MenuListView.as_view(), name='menu'),
     path('<int:pk>/', views.MenuItemView.as_view(), name='detail'),
     path('specials/', views.SpecialsListView.as_view(), name='specials'),
+    path('api/items/', views.menu_items_api, name='api_items'),
+    path('api/specials/', views.menu_specials_api, name='api_specials'),
+    path('cart_state/', views.cart_state, name='cart_state'),
     path('update_cart/', views.update_cart, name='update_cart'),
+    path('update_cart_batch/', views.update_cart_batch,
+         name='update_cart_batch'),
     path('cart_debug/', views.cart_debug, name='cart_debug')
 ]
@@ -0,0 +1,18 @@
+from core.version import get_version, bump_version
+
+MENU_VERSION_KEY = 'menu:version'
+
+
+def get_menu_version():
+    """
+    Return current menu version, starting a new one
+    if it's missing from cache, e.g. after a restart.
+    """
+    return get_version(MENU_VERSION_KEY)
+
+
+def bump_menu_version():
+    """
+    Start a new menu version, so data stamped with an older one is stale.
+    """
+    return bump_version(MENU_VERSION_KEY)
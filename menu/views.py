@@ -1,16 +1,51 @@
 from django.views import generic
 from django.shortcuts import get_object_or_404
 from django.http import (
-    HttpResponseRedirect, JsonResponse, HttpResponseBadRequest)
+    HttpResponseRedirect, JsonResponse, HttpResponseBadRequest, Http404)
 from django.urls import reverse
+from django.middleware.csrf import get_token
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import never_cache
+
+import json
 
 from .models import MenuItem, MenuSpecial
+from .fragments import get_menu_cards
+from .api import (
+    parse_fields, parse_available, parse_after, list_page,
+    API_PAGE_SIZE, MAX_API_PAGE_SIZE)
+from .version import get_menu_version
+from core.conditional import versioned_page
+from core.version import (
+    get_info_version, get_build_version, datetime_version)
+from orders.cart import (
+    resolve_cart, snapshot_item, get_cart_snapshot, add_to_snapshot,
+    remove_from_snapshot, save_cart)
+from orders.models import MAX_ORDER_VOLUME
+from orders.queue import MAX_ID
 
 UPD_ACTIONS = {
     'increase': 1,
     'decrease': -1,
     'remove': None
 }
+# upper limit of operations applied by a single batch request
+MAX_BATCH_OPERATIONS = 100
+
+
+def menu_page_versions(request, *args, **kwargs):
+    # every page shows navbar with info views
+    return [get_menu_version(), get_info_version(), get_build_version()]
+
+
+def item_page_versions(request, pk):
+    last_modified = MenuItem.objects.filter(
+        pk=pk, available=True).values_list('last_modified', flat=True)
+    if not last_modified:
+        return None
+    return [
+        datetime_version(last_modified[0]), get_info_version(),
+        get_build_version()]
 
 
 class ListAvailableItems(generic.ListView):
@@ -18,11 +53,19 @@ class ListAvailableItems(generic.ListView):
         return self.model.objects.exclude(available=False)
 
 
+@method_decorator(versioned_page(menu_page_versions), name='dispatch')
 class MenuListView(ListAvailableItems):
     template_name = 'menu/index.html'
     model = MenuItem
 
+    def get_context_data(self, **kwargs):
+        # cards are rendered from cache, object_list is left unevaluated
+        context = super().get_context_data(**kwargs)
+        context['menu_cards'] = get_menu_cards()
+        return context
+
 
+@method_decorator(versioned_page(item_page_versions), name='dispatch')
 class MenuItemView(generic.DetailView):
     template_name = 'menu/detail.html'
     model = MenuItem
@@ -32,6 +75,7 @@ class MenuItemView(generic.DetailView):
         return get_object_or_404(MenuItem, pk=pk, available=True)
 
 
+@method_decorator(versioned_page(menu_page_versions), name='dispatch')
 class SpecialsListView(ListAvailableItems):
     template_name = 'menu/specials.html'
     model = MenuSpecial
@@ -53,39 +97,198 @@ def cart_debug(request):
         reverse('menu:menu'))
 
 
+def api_page_versions(request, *args, **kwargs):
+    return [get_menu_version()]
+
+
+def menu_api_list(request, model):
+    """
+    Read-only JSON list of model rows, with query parameters:
+    fields - comma-separated fields to return, all by default;
+    available - true (default), false or all;
+    after - id of the last row of the previous page;
+    limit - number of rows per page.
+    Version changes with the menu, clients may keep rows until then.
+    """
+    try:
+        fields = parse_fields(model, request.GET.get('fields'))
+        available = parse_available(request.GET.get('available', 'true'))
+        after = parse_after(request.GET.get('after'))
+        limit = int(request.GET.get('limit', API_PAGE_SIZE))
+        if not 0 < limit <= MAX_API_PAGE_SIZE:
+            raise ValueError(limit)
+    except ValueError:
+        return HttpResponseBadRequest()
+
+    rows, next_cursor = list_page(model, fields, available, after, limit)
+    return JsonResponse({
+        'version': str(get_menu_version()),
+        'results': rows,
+        'next': next_cursor,
+    })
+
+
+@versioned_page(api_page_versions)
+def menu_items_api(request):
+    return menu_api_list(request, MenuItem)
+
+
+@versioned_page(api_page_versions)
+def menu_specials_api(request):
+    return menu_api_list(request, MenuSpecial)
+
+
+@never_cache
+def cart_state(request):
+    """
+    Per-session data left out of cacheable pages:
+    cart amounts and cost, and a CSRF token for cart updates.
+    """
+    # stale items are dropped from cart while refreshing its snapshot
+    get_cart_snapshot(request.session)
+    return JsonResponse({
+        'amounts': request.session.get('cart', {}),
+        'cart_cost': request.session.get('cart_cost', 0),
+        'csrf_token': get_token(request),
+    })
+
+
+def parse_item_id(item_id):
+    """
+    Return the cart key of a menu item id, e.g. '1' of '01'.
+    Raise ValueError on ids no menu item can have.
+    """
+    pk = int(item_id)
+    # ids past the range of database integers can't be queried
+    if not 0 < pk <= MAX_ID:
+        raise ValueError(item_id)
+    return str(pk)
+
+
 def update_cart(request):
     if request.method != 'GET':
         return HttpResponseRedirect(
             reverse('menu:menu'))
 
-    # TODO '' goes through and raises exception, so 'or None' is needed
-    item_id = request.GET.get('item_id') or None
-    menuitem = get_object_or_404(MenuItem, pk=item_id)
+    return change_cart(
+        request.session, request.GET.get('item_id'),
+        request.GET.get('action', ''))
 
-    cart = request.session.setdefault('cart', {})
-    key = item_id
 
-    action = request.GET.get('action', '')
+def change_cart(session, item_id, action):
+    """
+    Apply a single cart click to a session and return the response,
+    shared by update_cart and its consumer in menu.consumers.
+    Raise Http404 on missing and hidden items.
+    """
+    try:
+        key = parse_item_id(item_id)
+    except (ValueError, TypeError):
+        return HttpResponseBadRequest()
+
+    # items already in a fresh cart snapshot don't need a query
+    item = get_cart_snapshot(session).get(key)
+    if item is None:
+        # hidden items can't be ordered, so they aren't added to cart
+        menuitem = get_object_or_404(MenuItem, pk=key, available=True)
+        add_to_snapshot(session, menuitem)
+        item = session['cart_items'][key]
+
+    cart = session.setdefault('cart', {})
+
     try:
         amount_to_add = UPD_ACTIONS[action] or -cart[key]
-    except(KeyError):
+    except (KeyError):
         return HttpResponseBadRequest()
-    # TODO - a reasonable upper limit
 
-    new_amount = cart.setdefault(key, 0) + amount_to_add
-    if new_amount < 0:
-        # can't lower zero amount
+    new_amount = cart.get(key, 0) + amount_to_add
+    if not 0 <= new_amount <= MAX_ORDER_VOLUME:
+        # can't lower zero amount or order more than an order line holds
         return HttpResponseBadRequest()
     elif new_amount == 0:
-        cost_change = -(cart[key] * menuitem.price)
-        cart.pop(key)
+        cost_change = -(cart.pop(key, 0) * item['price'])
+        remove_from_snapshot(session, key)
     else:
-        cost_change = amount_to_add * menuitem.price
-        cart[key] = cart[key] + amount_to_add
+        cost_change = amount_to_add * item['price']
+        cart[key] = new_amount
 
-    new_cost = request.session['cart_cost'] = request.session.setdefault(
+    new_cost = session['cart_cost'] = session.setdefault(
         'cart_cost', 0) + cost_change
 
-    request.session.modified = True
+    session.modified = True
 
     return JsonResponse({'new_cost': new_cost})
+
+
+def update_cart_batch(request):
+    """
+    Apply a list of cart operations posted as JSON, e.g.
+    {"operations": [{"item_id": 1, "action": "increase"},
+                    {"item_id": 2, "amount": 3}]}
+    Either all of them are applied or none if any is invalid.
+    """
+    if request.method != 'POST':
+        return HttpResponseRedirect(
+            reverse('menu:menu'))
+
+    return change_cart_batch(request.session, request.body)
+
+
+def change_cart_batch(session, body):
+    """
+    Apply a batch of cart operations posted as body to a session and
+    return the response, shared by update_cart_batch and its consumer
+    in menu.consumers. Raise Http404 on missing and hidden items.
+    """
+    try:
+        operations = json.loads(body)['operations']
+        keys = [parse_item_id(operation['item_id'])
+                for operation in operations]
+    except (ValueError, KeyError, TypeError):
+        return HttpResponseBadRequest()
+    if not 0 < len(operations) <= MAX_BATCH_OPERATIONS:
+        return HttpResponseBadRequest()
+
+    snapshot = dict(get_cart_snapshot(session))
+    missing = {key: 0 for key in keys if key not in snapshot}
+    if missing:
+        new_items = resolve_cart(missing)
+        if len(new_items) != len(missing):
+            raise Http404("No MenuItem matches the given query.")
+        for key, menu_item in new_items.items():
+            snapshot[key] = snapshot_item(menu_item)
+
+    cart = dict(session.get('cart', {}))
+    for key, operation in zip(keys, operations):
+        new_amount = get_new_amount(cart.get(key, 0), operation)
+        if new_amount is None:
+            return HttpResponseBadRequest()
+        cart[key] = new_amount
+
+    cart = {key: amount for key, amount in cart.items() if amount != 0}
+    new_cost = save_cart(session, cart, snapshot)
+
+    return JsonResponse({
+        'amounts': {key: cart.get(key, 0) for key in keys},
+        'new_cost': new_cost
+    })
+
+
+def get_new_amount(amount, operation):
+    """
+    Return amount of an item in cart after applying an operation
+    with either an action or a new amount, None if it's invalid.
+    """
+    if 'amount' in operation:
+        new_amount = operation['amount']
+        if type(new_amount) is not int:
+            return None
+    else:
+        try:
+            amount_to_add = UPD_ACTIONS[operation.get('action')]
+        except (KeyError, TypeError):
+            return None
+        new_amount = amount + amount_to_add if amount_to_add else 0
+    if not 0 <= new_amount <= MAX_ORDER_VOLUME:
+        return None
+    return new_amount
@@ -7,6 +7,13 @@ from .models import OrderInfo, OrderContents
 class OrderContentsInline(admin.TabularInline):
     model = OrderContents
     extra = 0
+    # a select of the whole menu would be rendered for every row
+    autocomplete_fields = ('menu_item',)
+    # calculated from amount and price on save
+    readonly_fields = ('cost',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('menu_item')
 
 
 class DeliveredListFilter(admin.SimpleListFilter):
@@ -25,16 +32,49 @@ class DeliveredListFilter(admin.SimpleListFilter):
     def queryset(self, request, queryset):
 
         if self.value() == 'yes':
-            return queryset.filter(delivered__isnull=False)
+            return queryset.filter(status=OrderInfo.DELIVERED)
 
         if self.value() == 'no':
-            return queryset.filter(delivered__isnull=True)
+            return queryset.exclude(status=OrderInfo.DELIVERED)
 
 
 class OrderInfoAdmin(admin.ModelAdmin):
     inlines = [OrderContentsInline]
-    list_display = ('id', 'ordered', 'cooked', 'delivered', 'total_cost')
-    list_filter = [DeliveredListFilter]
+    list_display = (
+        'id', 'status', 'customer_name', 'item_count', 'ordered',
+        'cooked', 'delivered', 'total_cost')
+    list_filter = ['status', DeliveredListFilter]
+    # customer name and item count are stored on orders,
+    # so the list needs neither joins nor prefetches
+    list_select_related = False
+    autocomplete_fields = ('user',)
+    # orders are only moved on by actions, which stamp their time
+    # and notify status streams
+    readonly_fields = (
+        'total_cost', 'item_count', 'status', 'cooked', 'delivered')
+
+    actions = ['mark_cooked', 'mark_delivered']
+
+    def mark_cooked(self, request, queryset):
+        self._transition(
+            request, queryset, OrderInfo.COOKED, "%s marked cooked.")
+
+    mark_cooked.short_description = "Mark selected orders cooked"
+
+    def mark_delivered(self, request, queryset):
+        self._transition(
+            request, queryset, OrderInfo.DELIVERED, "%s marked delivered.")
+
+    mark_delivered.short_description = "Mark selected orders delivered"
+
+    def _transition(self, request, queryset, status, message):
+        # a single UPDATE, orders in other states are skipped
+        rows_updated = queryset.transition(status)
+        if rows_updated == 1:
+            message_bit = "1 order was"
+        else:
+            message_bit = "%s orders were" % rows_updated
+        self.message_user(request, message % message_bit)
 
 
 admin.site.register(OrderInfo, OrderInfoAdmin)
@@ -0,0 +1,92 @@
+from menu.models import MenuItem
+from menu.version import get_menu_version
+
+
+def resolve_cart(cart_dict):
+    """
+    Fetch MenuItem-s of a session cart with a single query.
+    Return a dict of items still available to customers,
+    keyed by the same string ids the cart uses.
+    Deleted and hidden items are left out.
+    """
+    if not cart_dict:
+        return {}
+    menu_items = MenuItem.objects.filter(
+        pk__in=list(cart_dict.keys()), available=True)
+    return {str(item.id): item for item in menu_items}
+
+
+def drop_stale_items(session, menu_items):
+    """
+    Remove from the session cart items missing in resolved menu_items
+    and recalculate cart cost.
+    """
+    cart = session.get('cart', {})
+    for key in list(cart.keys()):
+        if key not in menu_items:
+            cart.pop(key)
+    session['cart_cost'] = sum(
+        menu_items[key].price * amount for key, amount in cart.items())
+    session.modified = True
+
+
+def snapshot_item(menu_item):
+    """
+    Menu item data needed to render a cart line.
+    """
+    return {'name': menu_item.name, 'price': menu_item.price}
+
+
+def get_cart_snapshot(session):
+    """
+    Return names and prices of cart items, keyed by cart ids.
+    They are kept in session stamped with menu version
+    and refreshed with a single query once the stamp is stale.
+    """
+    cart = session.get('cart', {})
+    if not cart:
+        return {}
+
+    snapshot = session.get('cart_items', {})
+    version = get_menu_version()
+    if (session.get('cart_version') == version and
+            all(key in snapshot for key in cart)):
+        return snapshot
+
+    menu_items = resolve_cart(cart)
+    # prices might have changed too, so cost is always recalculated
+    drop_stale_items(session, menu_items)
+    snapshot = session['cart_items'] = {
+        key: snapshot_item(item) for key, item in menu_items.items()}
+    session['cart_version'] = version
+    return snapshot
+
+
+def add_to_snapshot(session, menu_item):
+    """
+    Store a menu item in a cart snapshot refreshed by get_cart_snapshot.
+    """
+    if not session.get('cart'):
+        # nothing to keep from a snapshot of an empty cart
+        session['cart_items'] = {}
+        session['cart_version'] = get_menu_version()
+    session['cart_items'][str(menu_item.id)] = snapshot_item(menu_item)
+    session.modified = True
+
+
+def remove_from_snapshot(session, key):
+    session.get('cart_items', {}).pop(key, None)
+    session.modified = True
+
+
+def save_cart(session, cart, snapshot):
+    """
+    Replace session cart with a new one, keeping a snapshot
+    of its items and its cost in sync. Return the new cost.
+    """
+    session['cart'] = cart
+    session['cart_items'] = {key: snapshot[key] for key in cart}
+    session['cart_version'] = get_menu_version()
+    session['cart_cost'] = sum(
+        snapshot[key]['price'] * amount for key, amount in cart.items())
+    return session['cart_cost']
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+import queue
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+
+
+class LocalBroker(object):
+    """
+    Fan out ids of orders whose status changed to subscribers
+    of this process. Subscribers get a queue the ids are put on
+    and read the current state of the order themselves, so events
+    may be repeated or coalesced. Streams held by other processes
+    only notice changes when they read the order on a heartbeat,
+    a broker shared by processes, e.g. on Redis pub/sub, has to
+    provide the same two methods to notify them right away.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+
+    def publish(self, order_ids):
+        with self.lock:
+            queues = [
+                (order_id, subscriber) for order_id in order_ids
+                for subscriber in self.subscribers.get(order_id, ())]
+        for order_id, subscriber in queues:
+            subscriber.put(order_id)
+
+    @contextmanager
+    def subscribe(self, order_id):
+        subscriber = queue.Queue()
+        with self.lock:
+            self.subscribers[order_id].add(subscriber)
+        try:
+            yield subscriber
+        finally:
+            with self.lock:
+                self.subscribers[order_id].discard(subscriber)
+                if not self.subscribers[order_id]:
+                    del self.subscribers[order_id]
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.ORDER_EVENTS_BROKER)()
+
+
+def publish_status_changes(order_ids):
+    """
+    Notify subscribers of orders once the change is committed,
+    so they never read the state it replaces.
+    """
+    order_ids = list(order_ids)
+    if order_ids:
+        transaction.on_commit(lambda: get_broker().publish(order_ids))
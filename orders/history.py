@@ -0,0 +1,35 @@
+from django.db.models import Prefetch, Q
+
+from .models import OrderInfo, OrderContents
+from .queue import encode_cursor, decode_cursor
+
+HISTORY_PAGE_SIZE = 10
+
+
+def order_history(user, before=None, limit=HISTORY_PAGE_SIZE):
+    """
+    Return a page of a user's orders, newest first, that precede
+    the cursor, and a cursor of the next page or None on the last one.
+    Pages are sought on the order_history_idx index and summaries are
+    stored on orders, so a page takes the same two queries however
+    many orders the user placed: one for orders and one for their lines.
+    Raise ValueError on malformed cursors.
+    """
+    orders = OrderInfo.objects.filter(user=user)
+    if before is not None:
+        ordered, pk = decode_cursor(before)
+        # the redundant bound lets the index be sought, not scanned
+        orders = orders.filter(
+            Q(ordered__lt=ordered) | Q(ordered=ordered, pk__lt=pk),
+            ordered__lte=ordered)
+    lines = OrderContents.objects.select_related('menu_item').only(
+        'order', 'amount', 'cost', 'menu_item', 'menu_item__name')
+    orders = list(orders.order_by('-ordered', '-pk').only(
+        'status', 'ordered', 'total_cost', 'item_count').prefetch_related(
+        Prefetch('ordercontents_set', queryset=lines))[:limit + 1])
+
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor(orders[-1])
+    return orders, next_cursor
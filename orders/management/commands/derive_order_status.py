@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from orders.models import OrderInfo
+
+
+class Command(BaseCommand):
+    help = (
+        "Set status of all orders from their cooked and delivered "
+        "timestamps, e.g. after status was added.")
+
+    def handle(self, *args, **options):
+        updated = OrderInfo.objects.derive_status()
+        self.stdout.write(f"Derived status of {updated} orders.")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from orders.models import OrderInfo
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile total costs and item counts of all orders with their "
+        "contents and fill in missing customer names.")
+
+    def handle(self, *args, **options):
+        updated = OrderInfo.objects.recompute_totals()
+        self.stdout.write(f"Recomputed totals of {updated} orders.")
+        named = OrderInfo.objects.fill_customer_names()
+        self.stdout.write(f"Filled customer names of {named} orders.")
@@ -1,23 +1,116 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Concat
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.utils import timezone
 
+from .events import publish_status_changes
+
 MAX_ORDER_VOLUME = 20
 
 
+class OrderInfoQuerySet(models.QuerySet):
+
+    def recompute_totals(self):
+        """
+        Reconcile total costs and item counts of orders with their
+        contents in a single query. Return the number of orders updated.
+        """
+        lines = OrderContents.objects.filter(
+            order=OuterRef('pk')).values('order')
+        lines_cost = lines.annotate(total=Sum('cost')).values('total')
+        lines_amount = lines.annotate(total=Sum('amount')).values('total')
+        return self.update(
+            total_cost=Coalesce(Subquery(lines_cost), 0),
+            item_count=Coalesce(Subquery(lines_amount), 0))
+
+    def fill_customer_names(self):
+        """
+        Store full names of users on orders without one, e.g. orders
+        placed before names were stored, in a single query.
+        Return the number of orders updated.
+        """
+        user_model = self.model._meta.get_field('user').related_model
+        full_names = user_model.objects.filter(pk=OuterRef('user')).annotate(
+            full_name=Concat('first_name', Value(' '), 'second_name')
+        ).values('full_name')
+        return self.filter(customer_name='').update(
+            customer_name=Subquery(full_names))
+
+    def derive_status(self):
+        """
+        Set status of orders from their timestamps, e.g. of orders
+        placed before status was stored. Return the number of orders
+        whose status changed.
+        """
+        states = (
+            (OrderInfo.DELIVERED, Q(delivered__isnull=False)),
+            (OrderInfo.COOKED,
+             Q(delivered__isnull=True, cooked__isnull=False)),
+            (OrderInfo.ORDERED,
+             Q(delivered__isnull=True, cooked__isnull=True)),
+        )
+        return sum(
+            self.filter(timestamps).exclude(status=status).update(
+                status=status)
+            for status, timestamps in states)
+
+    def transition(self, status):
+        """
+        Move orders in the preceding state to status with a single
+        UPDATE, stamping the matching timestamp. Orders in any other
+        state are left as they are. Return the number of orders moved.
+        Ids of the orders are read first, to notify their status streams,
+        which also read orders when idle, in case one was moved meanwhile.
+        """
+        previous_status, timestamp_field = OrderInfo.TRANSITIONS[status]
+        moving = self.filter(status=previous_status)
+        order_ids = list(moving.values_list('pk', flat=True))
+        moved = moving.update(
+            status=status, **{timestamp_field: timezone.now()})
+        publish_status_changes(order_ids)
+        return moved
+
+    def mark_cooked(self):
+        return self.transition(OrderInfo.COOKED)
+
+    def mark_delivered(self):
+        return self.transition(OrderInfo.DELIVERED)
+
+
 class OrderInfo(models.Model):
     """
     Order object bound to user with cost function
     calculated with belonging OrderContents.
     """
+    ORDERED = 'ordered'
+    COOKED = 'cooked'
+    DELIVERED = 'delivered'
+    STATUS_CHOICES = (
+        (ORDERED, 'Ordered'),
+        (COOKED, 'Cooked'),
+        (DELIVERED, 'Delivered'),
+    )
+    # status: (status it's reached from, timestamp field set)
+    TRANSITIONS = {
+        COOKED: (ORDERED, 'cooked'),
+        DELIVERED: (COOKED, 'delivered'),
+    }
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE)
 
     total_cost = models.IntegerField(default=0)
+    # denormalised for order lists
+    item_count = models.IntegerField(default=0)
+    customer_name = models.CharField(max_length=129, blank=True)
 
     # State properties
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=ORDERED,
+        db_index=True)
     ordered = models.DateTimeField(
         'date order was placed', auto_now_add=True)
     cooked = models.DateTimeField(
@@ -25,15 +118,45 @@ class OrderInfo(models.Model):
     delivered = models.DateTimeField(
         'date order was delivered', null=True, blank=True)
 
+    objects = OrderInfoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # kitchen queue of open orders, see orders.queue
+            models.Index(
+                fields=['ordered', 'id'], name='open_orders_idx',
+                condition=Q(delivered__isnull=True)),
+            # order history on profiles, see orders.history
+            models.Index(
+                fields=['user', 'ordered', 'id'], name='order_history_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.customer_name:
+            self.customer_name = self.user.get_full_name()
+        super().save(*args, **kwargs)
+
+    def adjust_totals(self, cost_change, amount_change):
+        """
+        Add changes to total cost and item count in database with
+        a single atomic update, so concurrent changes aren't lost
+        and other fields aren't written.
+        """
+        OrderInfo.objects.filter(pk=self.pk).update(
+            total_cost=F('total_cost') + cost_change,
+            item_count=F('item_count') + amount_change)
+        self.total_cost += cost_change
+        self.item_count += amount_change
+
     def update_current_state(self):
         """
-        When called, timing properties are gradually updated.
+        When called, the order is moved to the next state
+        and its timing properties are gradually updated.
         """
-        if self.cooked is None:
-            self.cooked = timezone.now()
-        else:
-            self.delivered = timezone.now()
-        self.save()
+        status = self.COOKED if self.status == self.ORDERED else self.DELIVERED
+        OrderInfo.objects.filter(pk=self.pk).transition(status)
+        # picks up changes made by concurrent bulk transitions as well
+        self.refresh_from_db(fields=['status', 'cooked', 'delivered'])
 
 
 class OrderContents(models.Model):
@@ -47,15 +170,29 @@ class OrderContents(models.Model):
         validators=[MaxValueValidator(MAX_ORDER_VOLUME), MinValueValidator(1)])
     cost = models.IntegerField(default=0)
 
+    # cost and amount counted in order totals
+    _saved_cost = 0
+    _saved_amount = 0
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_cost = instance.cost
+        instance._saved_amount = instance.amount
+        return instance
+
     def save(self, *args, **kwargs):
-        if self.id is not None:
-            self.order.total_cost -= self.cost
         self.cost = self.amount * self.menu_item.price
-        self.order.total_cost += self.cost
-        self.order.save()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.order.adjust_totals(
+                self.cost - self._saved_cost,
+                self.amount - self._saved_amount)
+        self._saved_cost = self.cost
+        self._saved_amount = self.amount
 
     def delete(self, *args, **kwargs):
-        self.order.total_cost -= self.cost
-        self.order.save()
-        super().delete(*args, **kwargs)
+        with transaction.atomic():
+            deleted = super().delete(*args, **kwargs)
+            self.order.adjust_totals(-self._saved_cost, -self._saved_amount)
+        return deleted
@@ -0,0 +1,60 @@
+from django.db.models import Q
+from django.utils import timezone
+
+from datetime import datetime, timedelta
+
+from .models import OrderInfo
+
+QUEUE_PAGE_SIZE = 50
+MAX_QUEUE_PAGE_SIZE = 200
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MAX_ID = 2 ** 63 - 1
+
+
+def encode_cursor(order):
+    """
+    Position of an order in the queue: its placement time
+    in microseconds and its id, which breaks ties.
+    """
+    microseconds = (order.ordered - EPOCH) // timedelta(microseconds=1)
+    return f'{microseconds}-{order.pk}'
+
+
+def decode_cursor(cursor):
+    """
+    Return placement time and id encoded by encode_cursor.
+    Raise ValueError on malformed cursors.
+    """
+    microseconds, pk = (int(part) for part in cursor.split('-'))
+    # ids past the range of database integers can't be queried
+    if not 0 < pk <= MAX_ID:
+        raise ValueError(cursor)
+    try:
+        return EPOCH + timedelta(microseconds=microseconds), pk
+    except OverflowError:
+        raise ValueError(cursor)
+
+
+def open_orders(after=None, limit=QUEUE_PAGE_SIZE):
+    """
+    Return a page of undelivered orders, oldest first, that follow
+    the cursor, and a cursor of the next page or None on the last one.
+    Pages are sought on the open_orders_idx partial index rather than
+    offset, so each takes the same time however long history grows.
+    """
+    orders = OrderInfo.objects.filter(delivered__isnull=True)
+    if after is not None:
+        ordered, pk = decode_cursor(after)
+        # the redundant bound lets the index be sought, not scanned
+        orders = orders.filter(
+            Q(ordered__gt=ordered) | Q(ordered=ordered, pk__gt=pk),
+            ordered__gte=ordered)
+    orders = list(orders.order_by('ordered', 'pk').prefetch_related(
+        'ordercontents_set__menu_item')[:limit + 1])
+
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor(orders[-1])
+    return orders, next_cursor
@@ -0,0 +1,21 @@
+// order state changes are pushed by the server,
+// the stream is reopened by the browser when it's closed early
+document.addEventListener("DOMContentLoaded", function() {
+  let container = document.getElementById('order-status')
+  if (!container || !window.EventSource) {
+    return
+  }
+  let source = new EventSource(container.dataset.stream_url)
+  source.addEventListener('status', function(event) {
+    let state = JSON.parse(event.data)
+    document.getElementById('order-status-value').textContent = state.status_display
+    if (state.status === 'delivered') {
+      source.close()
+    }
+  });
+  // the order was deleted, there's nothing left to follow
+  source.addEventListener('gone', function() {
+    source.close()
+    document.getElementById('order-status-value').textContent = 'Unavailable'
+  });
+});
@@ -1,12 +1,22 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
 
 from random import randint
 from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
+from . import views
+from .events import get_broker
+from .history import order_history
 from .models import OrderInfo, OrderContents
+from .queue import open_orders, encode_cursor
+from .views import build_cart_contents, write_order_to_db
 
 from menu.models import MenuItem
 from menu.tests import MenuTestConstants
@@ -15,6 +25,26 @@ from accounts.tests import AccountsTestConstants
 USER_MODEL = get_user_model()
 
 
+def query_plan(func):
+    """
+    SQLite plan of the first query made by func. The query is
+    explained with its parameters bound, as it runs, since
+    literal values can let SQLite pick a better plan.
+    """
+    queries = []
+
+    def capture(execute, sql, params, many, context):
+        queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(capture):
+        func()
+    sql, params = queries[0]
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return ' '.join(row[-1] for row in cursor.fetchall())
+
+
 class OrderInfoModelTests(AccountsTestConstants, TestCase):
 
     def test_order_from_user(self):
@@ -36,20 +66,219 @@ class OrderInfoModelTests(AccountsTestConstants, TestCase):
                 order=order, menu_item=menu_item, amount=amount)
             self.assertEqual(cost, order.total_cost)
 
+    def test_bulk_written_order_edited(self):
+        """
+        Total cost stays correct when contents of an order written
+        in bulk are edited or deleted one by one.
+        """
+        menu_items = [MenuItem.objects.create(name=f'dish{i}', price=10 * i)
+                      for i in range(1, 4)]
+        cart = {str(item.id): 2 for item in menu_items}
+        order = write_order_to_db(self.create_test_user(), cart)
+        self.assertEqual(OrderInfo.objects.get().total_cost, 120)
+
+        line = OrderContents.objects.get(menu_item=menu_items[0])
+        line.amount = 5
+        line.save()
+        self.assertEqual(line.order.total_cost, 150)
+        OrderContents.objects.get(menu_item=menu_items[2]).delete()
+        self.assertEqual(OrderInfo.objects.get(pk=order.pk).total_cost, 90)
+
+    def test_concurrent_line_edits_not_lost(self):
+        """
+        Lines of one order edited through separately loaded, stale
+        copies of the order all count towards its total cost.
+        """
+        menu_items = [MenuItem.objects.create(name=f'dish{i}', price=10 * i)
+                      for i in range(1, 4)]
+        cart = {str(item.id): 1 for item in menu_items}
+        order = write_order_to_db(self.create_test_user(), cart)
+        lines = [OrderContents.objects.select_related('order').get(
+            menu_item=menu_item) for menu_item in menu_items]
+
+        lines[0].amount = 3
+        lines[0].save()
+        lines[1].amount = 2
+        lines[1].save()
+        lines[2].delete()
+        self.assertEqual(OrderInfo.objects.get(pk=order.pk).total_cost, 70)
+        self.assertEqual(OrderInfo.objects.get(pk=order.pk).item_count, 5)
+
+    def test_edited_line_cost_ignored(self):
+        """
+        Line cost is calculated on save, so a cost edited
+        by hand doesn't throw off the order total.
+        """
+        menu_item = MenuItem.objects.create(name='dish', price=10)
+        order = write_order_to_db(
+            self.create_test_user(), {str(menu_item.id): 2})
+        line = OrderContents.objects.get()
+        line.cost = 1000
+        line.save()
+        self.assertEqual(line.cost, 20)
+        self.assertEqual(OrderInfo.objects.get(pk=order.pk).total_cost, 20)
+        line.cost = 1000
+        line.delete()
+        self.assertEqual(OrderInfo.objects.get(pk=order.pk).total_cost, 0)
+
+    def test_line_save_updates_total_cost_only(self):
+        """Saving a line doesn't write a stale copy of its order"""
+        menu_item = MenuItem.objects.create(name='dish', price=10)
+        order = write_order_to_db(
+            self.create_test_user(), {str(menu_item.id): 1})
+        line = OrderContents.objects.select_related('order').get()
+        order.update_current_state()
+
+        line.amount = 2
+        line.save()
+        order.refresh_from_db()
+        self.assertEqual(order.total_cost, 20)
+        self.assertIsNotNone(order.cooked)
+
+    def test_customer_names_filled(self):
+        """Orders stored without a customer name get their user's"""
+        user = self.create_test_user()
+        named_order = OrderInfo.objects.create(
+            user=user, customer_name='Someone Else')
+        OrderInfo.objects.create(user=user)
+        OrderInfo.objects.exclude(pk=named_order.pk).update(customer_name='')
+
+        call_command('recompute_totals', stdout=StringIO())
+        self.assertEqual(
+            list(OrderInfo.objects.order_by('pk').values_list(
+                'customer_name', flat=True)),
+            ['Someone Else', user.get_full_name()])
+
+    def test_recompute_totals(self):
+        """Drifted total costs are reconciled with order contents"""
+        menu_item = MenuItem.objects.create(name='dish', price=10)
+        user = self.create_test_user()
+        order = write_order_to_db(user, {str(menu_item.id): 3})
+        empty_order = OrderInfo.objects.create(user=user)
+        OrderInfo.objects.update(total_cost=999, item_count=999)
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(OrderInfo.objects.recompute_totals(), 2)
+        self.assertEqual(len(context.captured_queries), 1)
+        order.refresh_from_db()
+        empty_order.refresh_from_db()
+        self.assertEqual(order.total_cost, 30)
+        self.assertEqual(empty_order.total_cost, 0)
+        self.assertEqual(order.item_count, 3)
+        self.assertEqual(empty_order.item_count, 0)
+
+    def test_order_summary_stored(self):
+        """
+        Orders keep customer name and item count, which follows
+        their contents.
+        """
+        user = self.create_test_user()
+        menu_item = MenuItem.objects.create(name='dish', price=10)
+        order = write_order_to_db(user, {str(menu_item.id): 3})
+        self.assertEqual(order.customer_name, user.get_full_name())
+        self.assertEqual(order.item_count, 3)
+
+        line = OrderContents.objects.get()
+        line.amount = 5
+        line.save()
+        line.save()
+        self.assertEqual(OrderInfo.objects.get().item_count, 5)
+        OrderContents.objects.create(order=order, menu_item=menu_item)
+        self.assertEqual(OrderInfo.objects.get().item_count, 6)
+        line.delete()
+        self.assertEqual(OrderInfo.objects.get().item_count, 1)
+
     def test_order_update_status_function(self):
         """Status is correctly updated"""
         order = OrderInfo.objects.create(user=self.create_test_user())
         self.assertIsInstance(order.ordered, datetime)
         self.assertIsNone(order.cooked)
         self.assertIsNone(order.delivered)
+        self.assertEqual(order.status, OrderInfo.ORDERED)
 
         order.update_current_state()
         self.assertIsInstance(order.cooked, datetime)
         self.assertIsNone(order.delivered)
+        self.assertEqual(order.status, OrderInfo.COOKED)
 
         order.update_current_state()
         self.assertIsInstance(order.cooked, datetime)
         self.assertIsInstance(order.delivered, datetime)
+        self.assertEqual(order.status, OrderInfo.DELIVERED)
+
+    def test_bulk_transitions(self):
+        """
+        A selection is moved in a single query, orders not in
+        the preceding state keep their state and timestamps.
+        """
+        user = self.create_test_user()
+        orders = [OrderInfo.objects.create(user=user) for i in range(3)]
+        orders[0].update_current_state()
+        cooked = OrderInfo.objects.get(pk=orders[0].pk).cooked
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(OrderInfo.objects.mark_cooked(), 2)
+        # ids of moved orders are read for their status streams
+        self.assertEqual(len(context.captured_queries), 2)
+        self.assertEqual(
+            OrderInfo.objects.get(pk=orders[0].pk).cooked, cooked)
+        self.assertFalse(
+            OrderInfo.objects.filter(cooked__isnull=True).exists())
+
+        self.assertEqual(OrderInfo.objects.filter(
+            pk__in=[orders[0].pk, orders[1].pk]).mark_delivered(), 2)
+        self.assertEqual(OrderInfo.objects.mark_cooked(), 0)
+        self.assertEqual(
+            OrderInfo.objects.filter(status=OrderInfo.DELIVERED).count(), 2)
+        self.assertIsNone(OrderInfo.objects.get(pk=orders[2].pk).delivered)
+
+    def test_admin_transition_actions(self):
+        """
+        Admin actions move the whole selection.
+        """
+        user = USER_MODEL.objects.create_superuser(
+            **self.user_for_create_user)
+        orders = [OrderInfo.objects.create(user=user) for i in range(2)]
+        self.client.force_login(user)
+        for action, status in (('mark_cooked', OrderInfo.COOKED),
+                               ('mark_delivered', OrderInfo.DELIVERED)):
+            self.client.post(
+                reverse('admin:orders_orderinfo_changelist'),
+                {'action': action,
+                 '_selected_action': [order.pk for order in orders]})
+            self.assertEqual(
+                OrderInfo.objects.filter(status=status).count(), 2)
+
+    def test_admin_state_read_only(self):
+        """
+        Change form doesn't move orders around transitions.
+        """
+        user = USER_MODEL.objects.create_superuser(
+            **self.user_for_create_user)
+        order = OrderInfo.objects.create(user=user)
+        self.client.force_login(user)
+        response = self.client.get(reverse(
+            'admin:orders_orderinfo_change', args=(order.pk,)))
+        form_fields = response.context['adminform'].form.fields
+        for field in ('status', 'cooked', 'delivered'):
+            self.assertNotIn(field, form_fields)
+
+    def test_status_derived_from_timestamps(self):
+        """
+        Orders stored without status get it from their timestamps.
+        """
+        user = self.create_test_user()
+        now = timezone.now()
+        for cooked, delivered in ((None, None), (now, None), (now, now)):
+            OrderInfo.objects.create(
+                user=user, cooked=cooked, delivered=delivered)
+
+        call_command('derive_order_status', stdout=StringIO())
+        self.assertEqual(
+            list(OrderInfo.objects.order_by('pk').values_list(
+                'status', flat=True)),
+            [OrderInfo.ORDERED, OrderInfo.COOKED, OrderInfo.DELIVERED])
+        self.assertEqual(OrderInfo.objects.derive_status(), 0)
 
 
 """View tests."""
@@ -94,6 +323,115 @@ class ShoppingCartViewTests(OrdersTestCase):
         self.client.get(self.SHOP_CART_URL)
         self.assertEqual(self.client.session['cart_cost'], expected_cart_cost)
 
+    def test_unavailable_items_dropped(self):
+        """
+        Items deleted or hidden after being added to cart
+        are removed from it and from its cost.
+        """
+        expected_contents = self.fill_session_cart()
+        deleted = expected_contents.pop(0)
+        hidden = expected_contents.pop(0)
+        MenuItem.objects.get(pk=deleted['id']).delete()
+        hidden_item = MenuItem.objects.get(pk=hidden['id'])
+        hidden_item.available = False
+        hidden_item.save()
+
+        response = self.client.get(self.SHOP_CART_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['contents'], expected_contents)
+        self.assertEqual(self.client.session['cart'],
+                         {str(expected_contents[0]['id']):
+                          expected_contents[0]['amount']})
+        self.assertEqual(self.client.session['cart_cost'],
+                         expected_contents[0]['cost'])
+
+
+class CartResolutionTests(OrdersTestCase):
+
+    def set_session_cart(self, menu_items):
+        """
+        Put each of menu_items in session cart directly.
+        """
+        session = self.client.session
+        session['cart'] = {str(item.id): 1 for item in menu_items}
+        session['cart_cost'] = sum(item.price for item in menu_items)
+        session.save()
+
+    def count_cart_queries(self, number):
+        """
+        Return the number of queries made by shopping cart page
+        with a given number of items in cart.
+        """
+        MenuItem.objects.all().delete()
+        self.set_session_cart(self.get_list_of_menu_items(number))
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('orders:shopping_cart'))
+        self.assertEqual(len(response.context['contents']), number)
+        return len(context.captured_queries)
+
+    def test_build_cart_contents_single_query(self):
+        """
+        Cart contents are built with a single query regardless of cart size.
+        """
+        for number in (1, 15):
+            MenuItem.objects.all().delete()
+            menu_items = self.get_list_of_menu_items(number)
+            cart = {str(item.id): 1 for item in menu_items}
+            with self.assertNumQueries(1):
+                build_cart_contents(cart)
+
+    def capture_menu_queries(self, url, data=None):
+        """
+        Request a page and return queries made to menu items table.
+        """
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url, data)
+        return [query for query in context.captured_queries
+                if MenuItem._meta.db_table in query['sql']]
+
+    def test_cart_rendered_from_snapshot(self):
+        """
+        Shopping cart of a fresh snapshot is rendered without
+        fetching menu items.
+        """
+        self.fill_session_cart()
+        self.assertEqual(
+            self.capture_menu_queries(reverse('orders:shopping_cart')), [])
+
+    def test_update_cart_uses_snapshot(self):
+        """
+        Changing amount of an item already in cart doesn't fetch it again.
+        """
+        item_id = self.get_list_of_menu_items(1)[0].id
+        url = reverse('menu:update_cart')
+        query = {'item_id': item_id, 'action': 'increase'}
+        self.assertEqual(len(self.capture_menu_queries(url, query)), 1)
+        self.assertEqual(self.capture_menu_queries(url, query), [])
+
+    def test_snapshot_refreshed_on_menu_change(self):
+        """
+        Saving a menu item makes cart snapshot stale,
+        so new prices are shown and cart cost is recalculated.
+        """
+        contents = self.fill_session_cart()
+        menu_item = MenuItem.objects.get(pk=contents[0]['id'])
+        menu_item.price += 1
+        menu_item.save()
+
+        response = self.client.get(reverse('orders:shopping_cart'))
+        self.assertEqual(
+            response.context['contents'][0]['price'], menu_item.price)
+        self.assertEqual(
+            self.client.session['cart_cost'],
+            sum(line['cost'] for line in response.context['contents']))
+
+    def test_shopping_cart_queries_constant(self):
+        """
+        Number of queries on shopping cart page doesn't grow with the cart.
+        """
+        self.assertEqual(
+            self.count_cart_queries(1), self.count_cart_queries(15))
+
 
 class CheckoutConstants(object):
 
@@ -139,6 +477,31 @@ class CheckoutViewSpecificTests(CheckoutTestCase):
         for k, v in form_fields_w_values.items():
             self.assertEqual(v, self.user_for_tests[k])
 
+    def test_user_info_duplicates_rejected(self):
+        """
+        Logged in users can't order with another registered user's
+        phone number or email, guests can.
+        """
+        other_user = self.user_for_create_user
+        other_user.update(phone_number='54321', email='other@example.com')
+        USER_MODEL.objects.create_user(**other_user)
+        self.login_test_user()
+        self.fill_session_cart()
+        form = self.build_checkout_form()
+        form.update(phone_number='54321', email='other@example.com')
+
+        response = self.client.post(self.CHECKOUT_URL, form)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(response.context['form'].errors), {'phone_number', 'email'})
+        self.assertFalse(OrderInfo.objects.exists())
+
+        self.client.logout()
+        MenuItem.objects.all().delete()
+        self.fill_session_cart()
+        self.client.post(self.CHECKOUT_URL, form)
+        self.assertTrue(OrderInfo.objects.get().user.is_guest)
+
     def test_user_info_updated(self):
         """
         If user provides info different from prefilled, his info is updated.
@@ -166,6 +529,40 @@ class CheckoutViewSpecificTests(CheckoutTestCase):
         self.client.post(self.CHECKOUT_URL, self.build_checkout_form())
         self.assertTrue(USER_MODEL.objects.get().is_guest)
 
+    def test_guest_user_reused(self):
+        """
+        Anonymous orders with the same details and phone number,
+        however formatted, are placed by a single guest user.
+        """
+        form = self.build_checkout_form()
+        for phone_number in self.phone_format_variations:
+            MenuItem.objects.all().delete()
+            self.fill_session_cart()
+            form['phone_number'] = phone_number
+            self.client.post(self.CHECKOUT_URL, form)
+
+        guest_user = USER_MODEL.objects.get()
+        self.assertTrue(guest_user.is_guest)
+        self.assertEqual(
+            OrderInfo.objects.filter(user=guest_user).count(),
+            len(self.phone_format_variations))
+
+    def test_guest_address_not_overwritten(self):
+        """
+        An order with another address doesn't redirect
+        orders placed earlier with the same phone number.
+        """
+        form = self.build_checkout_form()
+        for street in ('first street', 'second street'):
+            MenuItem.objects.all().delete()
+            self.fill_session_cart()
+            form['street'] = street
+            self.client.post(self.CHECKOUT_URL, form)
+
+        first_order, second_order = OrderInfo.objects.order_by('pk')
+        self.assertEqual(first_order.user.street, 'first street')
+        self.assertEqual(second_order.user.street, 'second street')
+
 
 class CheckoutViewTests(CheckoutTestCase):
 
@@ -235,6 +632,37 @@ class CheckoutViewTests(CheckoutTestCase):
             }
             self.assertEqual(expected, dict_from_db)
 
+    def test_order_written_in_constant_queries(self):
+        """
+        Number of queries writing an order doesn't grow with the cart.
+        """
+        user = self.create_test_guest_user()
+        counts = []
+        for number in (1, 15):
+            MenuItem.objects.all().delete()
+            cart = {str(item.id): 2
+                    for item in self.get_list_of_menu_items(number)}
+            with CaptureQueriesContext(connection) as context:
+                write_order_to_db(user, cart)
+            counts.append(len(context.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_unavailable_items_at_checkout(self):
+        """
+        Cart with items hidden since being added is not ordered
+        and redirects to shopping cart.
+        """
+        contents = self.fill_session_cart()
+        MenuItem.objects.filter(pk=contents[0]['id']).update(available=False)
+
+        response = self.client.post(
+            self.CHECKOUT_URL, self.build_checkout_form(), follow=True)
+        self.assertRedirects(response, reverse('orders:shopping_cart'))
+        message = list(response.context.get('messages'))[0]
+        self.assertEqual(message.tags, 'error')
+        self.assertFalse(OrderInfo.objects.exists())
+        self.assertNotIn(str(contents[0]['id']), self.client.session['cart'])
+
     def test_cart_flushed(self):
         """
         On successful order, Session cart is emptied.
@@ -269,3 +697,272 @@ class LoggedInTests(ShoppingCartViewTests, CheckoutViewTests):
     def setUp(self):
         super().setUp()
         self.login_test_user()
+
+
+class KitchenQueueTests(AccountsTestConstants, TestCase):
+
+    QUEUE_URL = reverse('orders:kitchen_queue')
+    QUEUE_API_URL = reverse('orders:kitchen_queue_api')
+
+    def setUp(self):
+        self.staff = USER_MODEL.objects.create_superuser(
+            **self.user_for_create_user)
+        self.client.force_login(self.staff)
+
+    def create_orders(self, number):
+        """
+        Orders placed a minute apart, oldest first,
+        with two of them placed at the same time.
+        """
+        now = timezone.now()
+        orders = [OrderInfo.objects.create(user=self.staff)
+                  for i in range(number)]
+        for i, order in enumerate(orders):
+            order.ordered = now - timedelta(minutes=number - max(i, 1))
+            order.save()
+        return orders
+
+    def walk_queue(self, limit):
+        ids, pages, params = [], 0, {'limit': limit}
+        while True:
+            response = self.client.get(self.QUEUE_API_URL, params)
+            data = response.json()
+            ids += [order['id'] for order in data['orders']]
+            pages += 1
+            if data['next'] is None:
+                return ids, pages
+            params['after'] = data['next']
+
+    def test_queue_staff_only(self):
+        """
+        Customers can't see the kitchen queue.
+        """
+        self.client.logout()
+        for url in (self.QUEUE_URL, self.QUEUE_API_URL):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 302)
+
+    def test_queue_lists_open_orders_oldest_first(self):
+        """
+        Pages walk all undelivered orders once, oldest first.
+        """
+        orders = self.create_orders(7)
+        OrderInfo.objects.filter(pk=orders[3].pk).mark_cooked()
+        OrderInfo.objects.filter(pk=orders[3].pk).mark_delivered()
+        expected = [order.pk for order in orders if order != orders[3]]
+
+        ids, pages = self.walk_queue(limit=2)
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_queue_page_queries_constant(self):
+        """
+        Deep pages take as many queries as the first one.
+        """
+        orders = self.create_orders(6)
+        for line in range(2):
+            menu_item = MenuItem.objects.create(name=f'dish{line}', price=10)
+            for order in orders:
+                OrderContents.objects.create(order=order, menu_item=menu_item)
+
+        response = self.client.get(self.QUEUE_URL, {'limit': 2})
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.QUEUE_URL, {'limit': 2})
+        first_page_queries = len(context.captured_queries)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.QUEUE_URL, {
+                'limit': 2, 'after': response.context['next_cursor']})
+        self.assertEqual(len(context.captured_queries), first_page_queries)
+        self.assertContains(response, 'dish1 &times; 1', count=2)
+
+    def test_malformed_parameters(self):
+        for params in ({'after': 'abc'}, {'limit': 0}, {'limit': 'x'},
+                       {'after': f'{10 ** 30}-1'}, {'after': f'1-{10 ** 30}'}):
+            response = self.client.get(self.QUEUE_API_URL, params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_open_orders_index(self):
+        """
+        Queue is backed by a partial index without delivered orders.
+        """
+        indexes = {index.name: index for index in OrderInfo._meta.indexes}
+        self.assertIn('open_orders_idx', indexes)
+        self.assertIsNotNone(indexes['open_orders_idx'].condition)
+
+    @skipUnless(connection.vendor == 'sqlite', "SQLite query plan")
+    def test_later_pages_seek_index(self):
+        """
+        Pages after a cursor seek the index instead of scanning it.
+        """
+        orders = self.create_orders(3)
+        plan = query_plan(lambda: open_orders(encode_cursor(orders[0])))
+        self.assertIn('open_orders_idx (ordered>?)', plan)
+
+    @skipUnless(connection.vendor == 'sqlite', "SQLite query plan")
+    def test_older_history_seeks_index(self):
+        """
+        Order history pages before a cursor seek the index
+        by user and placement time.
+        """
+        orders = self.create_orders(3)
+        plan = query_plan(
+            lambda: order_history(self.staff, encode_cursor(orders[-1])))
+        self.assertIn('order_history_idx (user_id=? AND ordered<?)', plan)
+
+
+class OrdersAdminTests(AccountsTestConstants, TestCase):
+
+    def setUp(self):
+        self.staff = USER_MODEL.objects.create_superuser(
+            **self.user_for_create_user)
+        self.client.force_login(self.staff)
+
+    def create_orders(self, number, menu_items):
+        cart = {str(item.id): 1 for item in menu_items}
+        return [write_order_to_db(self.staff, cart) for i in range(number)]
+
+    def test_changelist_queries_constant(self):
+        """
+        Longer order lists don't take more queries.
+        """
+        menu_items = [MenuItem.objects.create(name=f'dish{i}', price=10)
+                      for i in range(2)]
+        url = reverse('admin:orders_orderinfo_changelist')
+        self.create_orders(2, menu_items)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        queries = len(context.captured_queries)
+
+        self.create_orders(8, menu_items)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(len(context.captured_queries), queries)
+        self.assertContains(response, self.staff.get_full_name(), count=10)
+
+    def test_change_page_does_not_list_menu(self):
+        """
+        Order contents pick menu items with autocomplete rather
+        than a select of the whole menu.
+        """
+        menu_items = [MenuItem.objects.create(name=f'dish{i}', price=10)
+                      for i in range(5)]
+        order, = self.create_orders(1, menu_items[:1])
+        response = self.client.get(
+            reverse('admin:orders_orderinfo_change', args=[order.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'dish4')
+
+
+class OrderStatusStreamTests(
+        CheckoutConstants, AccountsTestConstants, MenuTestConstants,
+        TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_test_user()
+        self.order = OrderInfo.objects.create(user=self.user)
+        self.stream_url = reverse(
+            'orders:order_status_stream', args=[self.order.id])
+
+    def open_stream(self):
+        response = self.client.get(self.stream_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return iter(response.streaming_content)
+
+    def advance(self):
+        """
+        Move the order on and publish it, as on_commit
+        callbacks don't run in TestCase.
+        """
+        self.order.update_current_state()
+        get_broker().publish([self.order.id])
+
+    def test_transitions_pushed(self):
+        """
+        Current state is sent first, then each transition,
+        and the stream ends once the order is delivered.
+        """
+        self.client.force_login(self.user)
+        events = self.open_stream()
+        self.assertIn(b'"status": "ordered"', next(events))
+        self.advance()
+        self.assertIn(b'"status": "cooked"', next(events))
+        self.advance()
+        self.assertIn(b'"status": "delivered"', next(events))
+        with self.assertRaises(StopIteration):
+            next(events)
+
+    def test_idle_stream_kept_alive(self):
+        self.client.force_login(self.user)
+        events = self.open_stream()
+        next(events)
+        with mock.patch.object(views, 'STREAM_HEARTBEAT', 0.01):
+            self.assertEqual(next(events), b': keepalive\n\n')
+
+    def test_unpublished_change_read_on_heartbeat(self):
+        """
+        Changes made by other processes, which aren't published
+        to this one, are picked up when the stream is idle.
+        """
+        self.client.force_login(self.user)
+        events = self.open_stream()
+        next(events)
+        self.order.update_current_state()
+        with mock.patch.object(views, 'STREAM_HEARTBEAT', 0.01):
+            self.assertIn(b'"status": "cooked"', next(events))
+
+    def test_deleted_order_gone(self):
+        """
+        Deleting a followed order sends a gone event and ends the stream.
+        """
+        self.client.force_login(self.user)
+        events = self.open_stream()
+        next(events)
+        self.order.delete()
+        get_broker().publish([self.order.id])
+        self.assertEqual(next(events), b'event: gone\ndata: {}\n\n')
+        with self.assertRaises(StopIteration):
+            next(events)
+
+    def test_stream_of_others_orders_not_found(self):
+        response = self.client.get(self.stream_url)
+        self.assertEqual(response.status_code, 404)
+        other_user = self.user_for_create_user
+        other_user.update(phone_number='54321', email='other@example.com')
+        self.client.force_login(USER_MODEL.objects.create_user(**other_user))
+        response = self.client.get(self.stream_url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_guest_follows_placed_order(self):
+        """
+        Success page links the stream of the order placed in the session.
+        """
+        menu_item = MenuItem.objects.create(name='Dish', price=10)
+        session = self.client.session
+        session['cart'] = {str(menu_item.id): 1}
+        session.save()
+        form = self.build_checkout_form()
+        form.update(phone_number='54321', email='guest@example.com')
+        response = self.client.post(reverse('orders:checkout'), form)
+        order = response.context['order']
+        url = reverse('orders:order_status_stream', args=[order.id])
+        self.assertContains(response, url)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class OrderStatusEventsTests(AccountsTestConstants, TransactionTestCase):
+
+    def test_transitions_published_on_commit(self):
+        order = OrderInfo.objects.create(user=self.create_test_user())
+        with get_broker().subscribe(order.id) as changes:
+            with transaction.atomic():
+                OrderInfo.objects.mark_cooked()
+                self.assertTrue(changes.empty())
+            self.assertEqual(changes.get_nowait(), order.id)
+
+            order.refresh_from_db()
+            order.update_current_state()
+            self.assertEqual(changes.get_nowait(), order.id)
+            OrderInfo.objects.mark_delivered()
+            self.assertTrue(changes.empty())
@@ -111,7 +111,7 @@ class ShoppingCartTests(OrdersFirefoxTests):
         for direction in directions:
             for i in direction['range']:
                 list_item[direction['action']].click()
-                sleep(0.1)
+                self.wait_for_cart_update()
                 new_cost = int(list_item['cost'].text)
                 new_food_cost = int(food_cost.text)
                 self.assertTrue(new_food_cost - old_food_cost ==
@@ -129,6 +129,7 @@ class ShoppingCartTests(OrdersFirefoxTests):
         old_food_cost = int(food_cost.text)
         cost_loss = self.expected_contents[index]['cost']
         list_item['remove'].click()
+        self.wait_for_cart_update()
 
         new_food_cost = int(food_cost.text)
         self.assertEqual(new_food_cost, old_food_cost - cost_loss)
@@ -6,4 +6,8 @@ app_name = 'orders'
 urlpatterns = [
     path('shopping_cart/', views.shopping_cart, name='shopping_cart'),
     path('checkout/', views.checkout, name='checkout'),
+    path('<int:order_id>/status/', views.order_status_stream,
+         name='order_status_stream'),
+    path('kitchen/', views.kitchen_queue, name='kitchen_queue'),
+    path('kitchen/api/', views.kitchen_queue_api, name='kitchen_queue_api'),
 ]
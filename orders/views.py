@@ -1,16 +1,45 @@
 from django.shortcuts import render
-from django.http import HttpResponseRedirect
+from django.http import (
+    Http404, HttpResponseRedirect, HttpResponseBadRequest, JsonResponse,
+    StreamingHttpResponse)
 from django.urls import reverse
 from django.contrib import messages
+from django.db import transaction
+from django.contrib.auth import get_user_model
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.serializers.json import DjangoJSONEncoder
+
+import json
+import queue
+from time import monotonic
 
 from .models import OrderInfo, OrderContents
-from menu.models import MenuItem
+from .cart import (
+    resolve_cart, drop_stale_items, get_cart_snapshot, snapshot_item)
+from .queue import open_orders, QUEUE_PAGE_SIZE, MAX_QUEUE_PAGE_SIZE
+from .events import get_broker
 from accounts.forms import CustomOrderForm
 
+USER_MODEL = get_user_model()
+
+# orders placed in a session whose status guests may follow
+PLACED_ORDERS_KEPT = 10
+# a status stream holds a worker thread while it's open, so it's closed
+# after STREAM_DURATION seconds and reopened by the browser after
+# STREAM_RETRY milliseconds. Every STREAM_HEARTBEAT seconds of quiet
+# the order is read again, for changes published to other processes,
+# and a comment is sent otherwise, so proxies don't drop the stream.
+STREAM_DURATION = 60
+STREAM_HEARTBEAT = 15
+STREAM_RETRY = 10000
+
 
 def shopping_cart(request):
     template_name = 'orders/shopping_cart.html'
-    cart_contents = build_cart_contents(request.session.get('cart', {}))
+    # stale items are dropped from cart while refreshing its snapshot
+    snapshot = get_cart_snapshot(request.session)
+    cart_contents = build_cart_contents(
+        request.session.get('cart', {}), snapshot)
     return render(request, template_name, cart_contents)
 
 
@@ -21,6 +50,13 @@ def checkout(request):
         messages.error(request, "Your cart is empty.")
         return HttpResponseRedirect(reverse('orders:shopping_cart'))
 
+    menu_items = resolve_cart(cart)
+    if len(menu_items) != len(cart):
+        drop_stale_items(request.session, menu_items)
+        messages.error(
+            request, "Some items in your cart are no longer available.")
+        return HttpResponseRedirect(reverse('orders:shopping_cart'))
+
     if request.user.is_authenticated:
         instance = request.user
     else:
@@ -30,16 +66,17 @@ def checkout(request):
         form = CustomOrderForm(request.POST, instance=instance)
 
         if form.is_valid():
-            user = form.save()
             if request.user.is_anonymous:
                 # don't register a guest user
-                user.set_unusable_password()
-                user.is_guest = True
-                user.save()
+                user = USER_MODEL.objects.get_or_create_guest_user(
+                    **form.cleaned_data)
+            else:
+                user = form.save()
 
-            write_order_to_db(user, cart)
+            order = write_order_to_db(user, cart, menu_items)
             flush_cart(request.session)
-            return render(request, 'orders/success.html')
+            remember_order(request.session, order)
+            return render(request, 'orders/success.html', {'order': order})
     else:
         form = CustomOrderForm(instance=instance)
 
@@ -49,27 +86,173 @@ def checkout(request):
 def flush_cart(session):
     session['cart'].clear()
     session['cart_cost'] = 0
+    session.pop('cart_items', None)
     session.modified = True
 
 
-def build_cart_contents(cart_dict):
+def remember_order(session, order):
+    placed_orders = session.get('placed_orders', [])
+    session['placed_orders'] = (
+        placed_orders + [order.id])[-PLACED_ORDERS_KEPT:]
+
+
+def build_cart_contents(cart_dict, snapshot=None):
+    """
+    Build a list of cart lines from a session cart and a snapshot
+    of its items, which is fetched at once if not provided.
+    """
+    if snapshot is None:
+        snapshot = {key: snapshot_item(item)
+                    for key, item in resolve_cart(cart_dict).items()}
     contents = []
     for item, amount in cart_dict.items():
-        current_item = MenuItem.objects.get(pk=item)
-        cost = current_item.price * amount
+        current_item = snapshot.get(item)
+        if current_item is None:
+            continue
+        cost = current_item['price'] * amount
         contents.append({
-            'id': current_item.id,
-            'name': current_item.name,
-            'price': current_item.price,
+            'id': int(item),
+            'name': current_item['name'],
+            'price': current_item['price'],
             'amount': amount,
             'cost': cost
         })
     return {'contents': contents}
 
 
-def write_order_to_db(user, cart):
-    new_order = OrderInfo.objects.create(user=user)
+@transaction.atomic
+def write_order_to_db(user, cart, menu_items=None):
+    """
+    Persist a session cart as an order with its contents.
+    Line costs and order totals are calculated here, so OrderContents
+    are inserted at once, bypassing their per-line save() bookkeeping.
+    """
+    if menu_items is None:
+        menu_items = resolve_cart(cart)
+    contents = []
     for item, amount in cart.items():
-        menu_item = MenuItem.objects.get(pk=item)
-        OrderContents.objects.create(
-            order=new_order, menu_item=menu_item, amount=amount)
+        menu_item = menu_items[item]
+        contents.append(OrderContents(
+            menu_item=menu_item, amount=amount,
+            cost=menu_item.price * amount))
+
+    new_order = OrderInfo.objects.create(
+        user=user, total_cost=sum(line.cost for line in contents),
+        item_count=sum(line.amount for line in contents))
+    for line in contents:
+        line.order = new_order
+    OrderContents.objects.bulk_create(contents)
+    return new_order
+
+
+def get_queue_page(request):
+    """
+    Page of the kitchen queue requested with 'after' cursor
+    and 'limit' parameters. Raise ValueError on malformed ones.
+    """
+    limit = int(request.GET.get('limit', QUEUE_PAGE_SIZE))
+    if not 0 < limit <= MAX_QUEUE_PAGE_SIZE:
+        raise ValueError(limit)
+    return open_orders(request.GET.get('after'), limit)
+
+
+@staff_member_required
+def kitchen_queue(request):
+    try:
+        orders, next_cursor = get_queue_page(request)
+    except ValueError:
+        return HttpResponseBadRequest()
+    return render(request, 'orders/kitchen_queue.html', {
+        'orders': orders,
+        'next_cursor': next_cursor,
+    })
+
+
+@staff_member_required
+def kitchen_queue_api(request):
+    try:
+        orders, next_cursor = get_queue_page(request)
+    except ValueError:
+        return HttpResponseBadRequest()
+    return JsonResponse({
+        'orders': [{
+            'id': order.id,
+            'status': order.status,
+            'ordered': order.ordered,
+            'cooked': order.cooked,
+            'total_cost': order.total_cost,
+            'contents': [{
+                'menu_item': line.menu_item.name,
+                'amount': line.amount,
+            } for line in order.ordercontents_set.all()],
+        } for order in orders],
+        'next': next_cursor,
+    })
+
+
+def order_state(order_id):
+    state = OrderInfo.objects.filter(pk=order_id).values(
+        'status', 'cooked', 'delivered').first()
+    if state is not None:
+        state['status_display'] = dict(
+            OrderInfo.STATUS_CHOICES)[state['status']]
+    return state
+
+
+def format_event(state):
+    if state is None:
+        # the order was deleted, clients stop following it
+        return 'event: gone\ndata: {}\n\n'
+    data = json.dumps(state, cls=DjangoJSONEncoder)
+    return f'event: status\ndata: {data}\n\n'
+
+
+def status_events(order_id, changes):
+    """
+    Yield server-sent events of an order's state, the current one
+    first and then one per change, until it's delivered or deleted,
+    which is told by a gone event, or the stream is due to close.
+    The order is read when a change is published on changes
+    and once per heartbeat otherwise.
+    """
+    deadline = monotonic() + STREAM_DURATION
+    state = order_state(order_id)
+    yield f'retry: {STREAM_RETRY}\n' + format_event(state)
+    while state is not None and state['status'] != OrderInfo.DELIVERED:
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return
+        try:
+            changes.get(timeout=min(STREAM_HEARTBEAT, remaining))
+            idle = False
+        except queue.Empty:
+            idle = True
+        new_state = order_state(order_id)
+        if new_state != state:
+            state = new_state
+            yield format_event(state)
+        elif idle:
+            yield ': keepalive\n\n'
+
+
+def subscribed_events(order_id):
+    with get_broker().subscribe(order_id) as changes:
+        yield from status_events(order_id, changes)
+
+
+def order_status_stream(request, order_id):
+    """
+    Stream state changes of an order placed in this session
+    or by the logged in user, instead of having the page reloaded.
+    """
+    order = OrderInfo.objects.filter(pk=order_id).only('user').first()
+    if order is None or not (
+            order_id in request.session.get('placed_orders', []) or
+            order.user_id == request.user.id):
+        raise Http404
+    response = StreamingHttpResponse(
+        subscribed_events(order_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # let proxies pass events as they come
+    response['X-Accel-Buffering'] = 'no'
+    return response